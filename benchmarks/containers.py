@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+
+
+
+#
+# DESCRIPTION
+#
+# compare size and throughput of the container formats ("zip" and the solid
+# "tar.zst" format) on a generated, realistic mix of attachments: many small
+# and similar text files, nested mindmaps, screenshots (PNG) and some larger
+# binary files. the files are added as by the packer (see "writeMember"), so
+# already compressed files are stored within ZIP containers.
+#
+# the solid container is written with frames of --frame-size bytes (1 MiB by
+# default, the packer uses SOLID_FRAME_SIZE), so that the default mix spans
+# many frames, which are compressed in parallel.
+#
+# usage:
+#
+#   python benchmarks/containers.py [--scale N] [--runs N] [--frame-size N]
+#
+
+
+
+
+# generals
+import argparse
+import os
+import random
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+# repository root (where packer.py is located)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import packer
+
+
+
+
+#
+# ATTACHMENT GENERATION
+#
+
+WORDS = (
+        "freeplane mindmap node note details attribute link image container "
+        "project meeting review action decision status owner deadline risk "
+        "requirement design test release customer feature issue summary"
+        ).split()
+
+
+def sentence(rnd, words):
+    return " ".join(rnd.choice(WORDS) for _word in range(words))
+
+
+def text(rnd, lines):
+
+    # meeting notes sharing the same template
+    lstLines = ["MEETING NOTES", "", "participants: " + sentence(rnd, 4), "", "AGENDA"]
+    for _line in range(lines):
+        lstLines.append(f"  {_line + 1}. " + sentence(rnd, rnd.randint(4, 14)))
+    lstLines += ["", "ACTIONS", "  owner: " + sentence(rnd, 2), "  deadline: 2022-0{}-1{}".format(
+            rnd.randint(1, 9), rnd.randint(0, 9))]
+    return "\n".join(lstLines).encode("utf-8")
+
+
+def mindmap(rnd, lstBase):
+
+    # version of a base mindmap with some nodes changed
+    lstLines = ['<map version="freeplane 1.9.13">', '<node TEXT="root" ID="ID_1">']
+    _start = rnd.randrange(len(lstBase) // 2)
+    for _number, _node in enumerate(lstBase[_start:_start + rnd.randint(20, len(lstBase) // 2)]):
+        lstLines.append(_node if rnd.random() > 0.1 else
+                f'<node TEXT="{sentence(rnd, 4)}" ID="ID_{rnd.randrange(10 ** 9)}" '
+                f'CREATED="1650000000000" MODIFIED="1650000000000"/>')
+    lstLines += ['</node>', '</map>']
+    return "\n".join(lstLines).encode("utf-8")
+
+
+def png(rnd, width, height, lstLayouts):
+
+    # screenshot-like image: one of a few application layouts with flat
+    # background and colored boxes, some boxes differ per screenshot
+    _background, _boxes = rnd.choice(lstLayouts)
+    _boxes = _boxes + [(rnd.randrange(width), rnd.randrange(height), rnd.randrange(20, 200), rnd.randrange(10, 60),
+               bytes(rnd.randrange(256) for _channel in range(3))) for _box in range(2)]
+    _rows = []
+    for _y in range(height):
+        _row = bytearray(_background * width)
+        for _x0, _y0, _w, _h, _color in _boxes:
+            if _y0 <= _y < _y0 + _h:
+                _x1 = min(width, _x0 + _w)
+                _row[_x0 * 3:_x1 * 3] = _color * (_x1 - _x0)
+        _rows.append(b"\0" + bytes(_row))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return b"\x89PNG\r\n\x1a\n" \
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) \
+            + chunk(b"IDAT", zlib.compress(b"".join(_rows), 6)) \
+            + chunk(b"IEND", b"")
+
+
+def generate(folder, scale=1, seed=1):
+
+    """
+    write attachment mix into folder and return list of (path, arcname)
+    """
+
+    rnd = random.Random(seed)
+    lstFiles = []
+
+    def add(name, data):
+        _path = os.path.join(folder, name)
+        with open(_path, "wb") as _file:
+            _file.write(data)
+        lstFiles.append((_path, "files/" + name))
+
+    lstBase = [
+            f'<node TEXT="{sentence(rnd, 4)}" ID="ID_{rnd.randrange(10 ** 9)}" '
+            f'CREATED="1650000000000" MODIFIED="1650000000000"/>'
+            for _number in range(800)
+            ]
+    lstLayouts = [
+            (bytes(rnd.choice(((240, 240, 240), (255, 255, 255), (30, 30, 30)))),
+             [(rnd.randrange(640), rnd.randrange(400), rnd.randrange(20, 200), rnd.randrange(10, 60),
+               bytes(rnd.randrange(256) for _channel in range(3))) for _box in range(12)])
+            for _layout in range(3)
+            ]
+
+    for _number in range(400 * scale):
+        add(f"note_{_number}.txt", text(rnd, rnd.randint(5, 40)))
+    for _number in range(60 * scale):
+        add(f"submap_{_number}.mm", mindmap(rnd, lstBase))
+    for _number in range(80 * scale):
+        add(f"screenshot_{_number}.png", png(rnd, 640, 400, lstLayouts))
+    for _number in range(scale):
+        add(f"video_{_number}.bin", bytes(rnd.randrange(256) for _byte in range(512 * 1024)))
+
+    return lstFiles
+
+
+
+
+#
+# MEASUREMENT
+#
+
+def measure(lstFiles, container_format, target, frame_size):
+
+    # write all files into container, return duration, size and frame count
+    _start = time.perf_counter()
+    if container_format == "tar.zst":
+        _container = packer.SolidWriter(target, frame_size=frame_size)
+    else:
+        _container = packer.openContainer(target, container_format)
+    with _container:
+        for _path, _arcname in lstFiles:
+            packer.writeMember(_container, _arcname, _path)
+    _frames = len(_container.frames) if container_format == "tar.zst" else 0
+    return time.perf_counter() - _start, os.path.getsize(target), _frames
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='compare container formats')
+    parser.add_argument('--scale', type=int, default=8, help='size factor of the attachment mix')
+    parser.add_argument('--runs', type=int, default=3, help='number of runs per format')
+    parser.add_argument('--frame-size', type=int, default=1024 * 1024, help='frame size of solid containers')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as _folder:
+
+        lstFiles = generate(_folder, args.scale)
+        _total = sum(os.path.getsize(_path) for _path, _arcname in lstFiles)
+        print(f'{len(lstFiles)} files, {packer.formatBytes(_total)}')
+        print(f'{"format":<10} {"size":>12} {"ratio":>7} {"frames":>7} {"time [s]":>9} {"throughput":>14}')
+
+        for _format in packer.CONTAINER_FORMATS:
+            _target = os.path.join(_folder, "container." + _format)
+            lstTimes = []
+            for _run in range(args.runs):
+                _time, _size, _frames = measure(lstFiles, _format, _target, args.frame_size)
+                lstTimes.append(_time)
+            _time = statistics.median(lstTimes)
+            print(
+                    f'{_format:<10} {packer.formatBytes(_size):>12} {_size / _total:>7.3f} {_frames or "-":>7} '
+                    f'{_time:>9.2f} {packer.formatBytes(_total / _time) + "/s":>14}'
+                    )
+
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+
+
+
+#
+# DESCRIPTION
+#
+# measure the start-up cost of the packer's command line interfaces using
+# Python's "-X importtime" option. each command is run several times in a fresh
+# interpreter. the sum of the cumulative import times of all top-level imports
+# and the slowest imported packages are reported.
+#
+# usage:
+#
+#   python benchmarks/importtime.py [--runs N] [--top N]
+#
+
+
+
+
+# generals
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+
+
+
+# repository root (where packer.py and gui.py are located)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# commands to be measured
+COMMANDS = [
+        ("import packer", ["-c", "import packer"]),
+        ("packer.py --help", ["packer.py", "--help"]),
+        ("packer.py pack --help", ["packer.py", "pack", "--help"]),
+        ("packer.py verify --help", ["packer.py", "verify", "--help"]),
+        ("packer.py unpack --help", ["packer.py", "unpack", "--help"]),
+        ("packer.py diff --help", ["packer.py", "diff", "--help"]),
+        ("gui.py pack --help", ["gui.py", "pack", "--help"]),
+        ]
+
+# line format of "-X importtime":
+# "import time: self [us] | cumulative | imported package"
+LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+
+
+def measure(args):
+
+    """
+    run command once and return wall time and top-level imports
+    """
+
+    _start = time.perf_counter()
+    _result = subprocess.run(
+            [sys.executable, "-X", "importtime"] + args,
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            )
+    _wall = time.perf_counter() - _start
+
+    # only top-level imports (one space of indentation) are summed up, as
+    # their cumulative time already contains the nested imports
+    dicImports = {}
+    for _line in _result.stderr.splitlines():
+        _match = LINE.match(_line)
+        if _match and len(_match[3]) == 1:
+            dicImports[_match[4]] = int(_match[2])
+
+    return _wall, dicImports
+
+
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='measure packer start-up time')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs per command')
+    parser.add_argument('--top', type=int, default=5, help='number of slowest imports to show')
+    args = parser.parse_args()
+
+    print(f'{"command":<24} {"wall [ms]":>10} {"imports [ms]":>13}   slowest imports')
+    for _name, _args in COMMANDS:
+        lstWall = []
+        lstImport = []
+        for _run in range(args.runs):
+            _wall, dicImports = measure(_args)
+            lstWall.append(_wall * 1000)
+            lstImport.append(sum(dicImports.values()) / 1000)
+        _slowest = sorted(dicImports.items(), key=lambda _item: -_item[1])[:args.top]
+        print(
+                f'{_name:<24} {statistics.median(lstWall):>10.1f} {statistics.median(lstImport):>13.1f}   '
+                + ", ".join(f'{_module} {_us / 1000:.1f}' for _module, _us in _slowest)
+                )
+
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+
+
+
+
+#
+# DESCRIPTION
+#
+# measure the memory used by packing mindmaps of growing size. each generated
+# mindmap has many references (node links, in-line images and images and links
+# within html notes) to a limited set of linked files, some of them missing.
+# the peaks of the memory allocated by Python (as traced by tracemalloc) are
+# reported per mindmap size, for the stages collecting the references and
+# copying the files as well as for the whole pack. the modules needed for
+# packing are imported by a first small pack. memory allocated by libxml2 for
+# the element tree itself is not traced. the time includes the overhead of
+# tracemalloc.
+#
+# usage:
+#
+#   python benchmarks/memory.py [--sizes N [N ...]] [--files N]
+#
+
+
+
+
+# generals
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# repository root (where packer.py is located)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import packer
+
+
+
+
+#
+# MINDMAP GENERATION
+#
+
+def mindmap(nodes, files):
+
+    """
+    return mindmap with given number of nodes as bytes
+
+    every node links a file, every 4th node has an in-line image, every 8th
+    node has a html note with an image and a link. every 50th reference points
+    to a file which does not exist.
+    """
+
+    def link(number):
+        if number % 50 == 0:
+            return f"missing/gone_{number % 997}.txt"
+        return f"attachments/file_{number % files}.txt"
+
+    lstLines = ['<map version="freeplane 1.9.13">', '<node TEXT="root" ID="ID_0">']
+    for _number in range(1, nodes):
+        lstLines.append(f'<node TEXT="node {_number}" ID="ID_{_number}" LINK="{link(_number)}">')
+        if _number % 4 == 0:
+            lstLines.append(f'<hook NAME="ExternalObject" URI="{link(_number + 1)}"/>')
+        if _number % 8 == 0:
+            lstLines.append(
+                    '<richcontent TYPE="NOTE"><html><body>'
+                    f'<p><img src="{link(_number + 2)}"/> see <a href="{link(_number + 3)}">file</a></p>'
+                    '</body></html></richcontent>'
+                    )
+        lstLines.append('</node>')
+    lstLines += ['</node>', '</map>']
+    return "\n".join(lstLines).encode("utf-8")
+
+
+
+
+#
+# MEASUREMENT
+#
+
+class StagePeaks(packer.Progress):
+
+    # progress recording the peak of traced memory of each stage
+    def __init__(self):
+        super().__init__()
+        self.peaks = {}
+
+    def start(self, stage, files_total=0, bytes_total=0):
+        tracemalloc.reset_peak()
+        super().start(stage, files_total, bytes_total)
+
+    def finish(self):
+        super().finish()
+        self.peaks[self.stage] = tracemalloc.get_traced_memory()[1]
+
+
+def measure(folder, nodes):
+
+    # pack mindmap file and return duration and peaks of traced memory per
+    # stage
+    _mmpath = os.path.join(folder, f"map_{nodes}.mm")
+    with open(_mmpath, "wb") as _file:
+        _file.write(mindmap(nodes, len(os.listdir(os.path.join(folder, "attachments")))))
+
+    _progress = StagePeaks()
+    tracemalloc.start()
+    _start = time.perf_counter()
+    packer.Packer().pack(_mmpath, _mmpath + "x", log_level="error", progress=_progress)
+    _duration = time.perf_counter() - _start
+    tracemalloc.stop()
+
+    return _duration, _progress.peaks
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='measure memory used by packing large mindmaps')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000],
+            help='numbers of nodes of the mindmaps')
+    parser.add_argument('--files', type=int, default=500, help='number of distinct linked files')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as _folder:
+
+        os.mkdir(os.path.join(_folder, "attachments"))
+        for _number in range(args.files):
+            with open(os.path.join(_folder, "attachments", f"file_{_number}.txt"), "w") as _file:
+                _file.write(f"attachment {_number}\n")
+
+        # a small mindmap is packed first, so that the modules imported on
+        # first use are not counted as memory of the first measurement
+        measure(_folder, 10)
+
+        print(f'{"nodes":>8} {"time [s]":>9} {"collect":>12} {"copy":>12} {"total":>12} {"per node":>10}')
+        for _nodes in args.sizes:
+            _duration, dicPeaks = measure(_folder, _nodes)
+            _peak = max(dicPeaks.values())
+            print(
+                    f'{_nodes:>8} {_duration:>9.2f}'
+                    f' {packer.formatBytes(dicPeaks["collect"]):>12}'
+                    f' {packer.formatBytes(dicPeaks["copy"]):>12}'
+                    f' {packer.formatBytes(_peak):>12} {_peak / _nodes:>8.0f} B'
+                    )
+
+
+
+
+if __name__ == "__main__":
+    main()
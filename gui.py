@@ -14,7 +14,6 @@ import os
 import locale
 
 # application
-from gooey import Gooey, GooeyParser
 import packer
 
 
@@ -24,7 +23,7 @@ import packer
 # application version
 #
 
-__version__ = "1.0"
+__version__ = "1.1"
 
 
 
@@ -35,10 +34,41 @@ __version__ = "1.0"
 
 # if arguments are added, Gooey GUI should not be active
 # https://github.com/chriskiehl/Gooey/issues/449
+#
+# in this case, Gooey is not even imported (which takes a noticeable amount of
+# time) and the plain argparse parser is used instead.
+
+USE_GOOEY = len(sys.argv) < 2
+if "--ignore-gooey" in sys.argv:
+    sys.argv.remove("--ignore-gooey")
+
+
+
+
+#
+# Gooey helpers
+#
+
+def gooey(**options):
+
+    # apply Gooey decorator only in GUI mode
+    def decorator(function):
+        if not USE_GOOEY:
+            return function
+        from gooey import Gooey
+        return Gooey(**options)(function)
+
+    return decorator
+
+
+def addArgument(group, *args, **kwargs):
+
+    # argparse does not know about Gooey's widget options
+    if not USE_GOOEY:
+        kwargs.pop('widget', None)
+        kwargs.pop('gooey_options', None)
 
-if len(sys.argv) >= 2:
-    if not "--ignore-gooey" in sys.argv:
-        sys.argv.append("--ignore-gooey")
+    return group.add_argument(*args, **kwargs)
 
 
 
@@ -47,12 +77,23 @@ if len(sys.argv) >= 2:
 # argument parser
 #
 
-@Gooey(
+@gooey(
         program_name="Freeplane Packer GUI v" + __version__ + " [ framework v" + packer.__version__ + " ]",
         program_description="pack mindmap and linked files into one container",
         navigation="TABBED",
         default_size=(800,650),
 
+        # the packer prints its progress as lines starting with "progress:
+        # <percent>%", the percentage of the whole pack over all stages.
+        # Gooey uses them to drive its progress bar and time estimate.
+        progress_regex=r"^progress: (?P<percent>\d+)%",
+        progress_expr="percent",
+        hide_progress_msg=True,
+        timing_options={
+            'show_time_remaining': True,
+            'hide_time_remaining_on_complete': True,
+            },
+
         # the correct choice of character encoding is critical for proper GUI
         # operation. when compiling / building an executable aiming at using
         # the GUI as a deployed application, the encoding should be set to
@@ -73,7 +114,11 @@ def parseOptArgs():
     #
 
     # define parser
-    parser = GooeyParser(
+    if USE_GOOEY:
+        from gooey import GooeyParser as Parser
+    else:
+        Parser = argparse.ArgumentParser
+    parser = Parser(
             description='pack mindmap and files into container',
             usage='freeplane-packer [<args>]')
 
@@ -99,7 +144,8 @@ def parseOptArgs():
     # define arguments for packer
     #
 
-    pack.add_argument(
+    addArgument(
+            pack,
             '--mmpath',
             default='',
             widget='FileChooser',
@@ -107,14 +153,84 @@ def parseOptArgs():
             help='mindmap file path. where to find the mindmap within the local file system.',
             gooey_options=dict(wildcard="Freeplane mindmap files (.mm)|*.mm")
             )
-    pack.add_argument(
+    addArgument(
+            pack,
             '--mmxpath',
             default='',
             widget='FileSaver',
             help='container file path. this file will contain the mindmap and further files.',
             gooey_options=dict(wildcard="MMX files (.mmx)|*.mmx")
             )
-    pack.add_argument(
+    addArgument(
+            pack,
+            '--format',
+            default='zip',
+            choices=packer.CONTAINER_FORMATS,
+            help='container format. "zip" can be opened by Freeplane, "tar.zst" compresses many similar files much better.',
+            )
+    addArgument(
+            pack,
+            '--search-root',
+            default='',
+            widget='DirChooser',
+            help='folder path. linked files which do not exist are looked up by name below this folder.',
+            )
+    addArgument(
+            pack,
+            '--search-hash',
+            action='store_true',
+            help='compare contents of files found several times below the search root. identical copies are not reported as ambiguous.',
+            )
+    addArgument(
+            pack,
+            '--search-cache',
+            default='',
+            widget='FileSaver',
+            help='cache file path. the index of the search root is stored in this file and reused by later runs.',
+            )
+    addArgument(
+            pack,
+            '--profile',
+            action='store_true',
+            help='profile each pipeline stage. the profiles are written into the folder "<container>.profile".',
+            )
+    addArgument(
+            pack,
+            '--profile-memory',
+            action='store_true',
+            help='profile also the memory allocations of each pipeline stage (slower).',
+            )
+    addArgument(
+            pack,
+            '--log-level',
+            default='info',
+            help='log messages will be displayed only if severity level is matching or above. options are "debug", "info", "warning" or "error"',
+            )
+
+
+
+
+    #
+    # define arguments for unpacker
+    #
+
+    addArgument(
+            unpack,
+            '--mmxpath',
+            default='',
+            widget='FileChooser',
+            required=True,
+            help='container file path. the container to extract the files from.',
+            )
+    addArgument(
+            unpack,
+            '--folder',
+            default='',
+            widget='DirChooser',
+            help='folder path. where to extract the files into. default is the container path without extension.',
+            )
+    addArgument(
+            unpack,
             '--log-level',
             default='info',
             help='log messages will be displayed only if severity level is matching or above. options are "debug", "info", "warning" or "error"',
@@ -158,26 +274,57 @@ if __name__ == "__main__":
     # evaluate tabbed command
     #
 
+    # log into console / GUI window
+    packer.configureLogging()
+
     # create application object
     app = packer.Packer()
 
-    if arguments.command == "pack":
+    # missing optional packages (e.g. "zstandard") are reported as errors
+    try:
+
+        if arguments.command == "pack":
 
 
 
 
-        # print separation
-        print('\n---- PACKING FREEPLANE CONTAINER')
+            # print separation
+            print('\n---- PACKING FREEPLANE CONTAINER')
 
 
 
 
-        #
-        # create clickview
-        #
+            #
+            # create clickview
+            #
+
+            app.pack(
+                    mmpath=arguments.mmpath,
+                    mmxpath=arguments.mmxpath,
+                    log_level=arguments.log_level,
+                    progress=packer.Progress(packer.ProgressLines()),
+                    container_format=arguments.format,
+                    search_roots=[arguments.search_root] if arguments.search_root else [],
+                    search_hash=arguments.search_hash,
+                    search_cache=arguments.search_cache,
+                    profile=arguments.profile or arguments.profile_memory,
+                    profile_memory=arguments.profile_memory,
+                    )
+
+        elif arguments.command == "unpack":
+
+
+
+
+            # print separation
+            print('\n---- UNPACKING FREEPLANE CONTAINER')
+
+            app.unpack(
+                    mmxpath=arguments.mmxpath,
+                    folder=arguments.folder,
+                    log_level=arguments.log_level,
+                    )
 
-        app.pack(
-                mmpath=arguments.mmpath,
-                mmxpath=arguments.mmxpath,
-                log_level=arguments.log_level,
-                )
+    except ImportError as error:
+        print(f'[ ERROR  : {error} ]')
+        sys.exit(1)
@@ -22,38 +22,405 @@
 # generals
 from __future__ import print_function
 import argparse
-import pathlib
 import os
-import shutil
 import re
 import sys
-import datetime
+import json
 import logging
+import time
 
-# application
-import freeplane
+# heavy modules (freeplane / lxml, archive and compression modules) are only
+# imported when a command actually needs them. this keeps the start of the
+# command line interface (e.g. "--help") and "import packer" fast. see
+# "benchmarks/importtime.py".
 
 
 
 
-__version__ = "0.3"
+__version__ = "0.4"
 
 
 
 
 # logging
-logging.basicConfig(
-        format='%(name)s - %(levelname)-8s - %(message)s',
-        level=logging.INFO,
-        )
+
+# the packer only logs into its own logger. handlers are configured by the
+# command line interface (see "configureLogging") or by the application using
+# the packer as a library.
+
+logger = logging.getLogger("packer")
+logger.addHandler(logging.NullHandler())
+
+# number of missing files which are reported one by one before only the summary
+# is logged. all details can be written into a report file.
+MAX_MISSING_WARNINGS = 10
+
+# number of functions / allocation sites listed per stage by "--profile"
+PROFILE_LINES = 40
+
+
+
+
+# buffers
+
+# chunk size used when copying file objects
+COPY_BUFSIZE = 1024 * 1024
+
+# chunk size of copies within the kernel and of CRC computations on memory
+# mappings. the progress of large files is reported after each chunk.
+KERNEL_CHUNK_SIZE = 64 * 1024 * 1024
+
+# containers built in memory spill into a temporary file above this size
+SPOOL_THRESHOLD = 64 * 1024 * 1024
+
+# already compressed file types, stored uncompressed within ZIP containers
+STORED_EXTENSIONS = frozenset((
+        ".jpg", ".jpeg", ".png", ".gif", ".webp",
+        ".mp4", ".mkv", ".mov", ".avi", ".webm",
+        ".mp3", ".ogg", ".m4a", ".flac",
+        ".zip", ".gz", ".bz2", ".xz", ".7z", ".rar", ".zst", ".jar",
+        ".mmx", ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp",
+        ))
+
+
+def configureLogging(level=logging.INFO):
+    logging.basicConfig(
+            format='%(name)s - %(levelname)-8s - %(message)s',
+            level=level,
+            )
 
 
 
 
 # check dependencies
-if float(freeplane.__version__[:3]) < 0.7:
-    print('[ ERROR  : please upgrade package "freeplane-io" to at least "v0.7" ]')
-    sys.exit(1)
+def importFreeplane():
+
+    # import on first use. the command line interfaces report the error.
+    import freeplane
+
+    if tuple(int(_part) for _part in re.findall(r'\d+', freeplane.__version__)[:2]) < (0, 7):
+        raise ImportError('please upgrade package "freeplane-io" to at least "v0.7"')
+
+    return freeplane
+
+
+
+
+# progress reporting
+
+# share of the pipeline stages of the whole pack in percent, in their order.
+# copying the files usually takes most of the time.
+PROGRESS_WEIGHTS = (
+        ("parse", 5),
+        ("collect", 5),
+        ("resolve", 3),
+        ("index", 2),
+        ("copy", 75),
+        ("save", 5),
+        ("archive", 5),
+        )
+
+
+class Progress(object):
+
+    """
+    progress state of a running pack operation
+
+    the packer reports its pipeline stages ("parse", "collect", "resolve",
+    "copy", "save" and "archive", as well as "index" when search roots are
+    indexed) together with the number of files and bytes already processed
+    within the current stage. each time the state changes, the optional
+    callback is invoked with this object as only argument. in order not to
+    slow down the per-file loops, the callback is called at most once per
+    interval (seconds), except for the start and the end of a stage.
+    """
+
+    def __init__(self, callback=None, interval=0.25):
+        self._callback = callback
+        self._interval = interval
+        self._next = 0.0
+        self.stage = ""
+        self.files_done = 0
+        self.files_total = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.started = time.monotonic()
+        self.finished = False
+
+    def start(self, stage, files_total=0, bytes_total=0):
+        self.stage = stage
+        self.files_done = 0
+        self.files_total = files_total
+        self.bytes_done = 0
+        self.bytes_total = bytes_total
+        self.started = time.monotonic()
+        self.finished = False
+        self._emit(self.started)
+
+    def advance(self, files=1, nbytes=0):
+        self.files_done += files
+        self.bytes_done += nbytes
+        if self._callback is not None:
+            _now = time.monotonic()
+            if _now >= self._next:
+                self._emit(_now)
+
+    def finish(self):
+        self.files_done = max(self.files_done, self.files_total)
+        self.bytes_done = max(self.bytes_done, self.bytes_total)
+        self.finished = True
+        self._emit(time.monotonic())
+
+    def _emit(self, now):
+        self._next = now + self._interval
+        if self._callback is not None:
+            self._callback(self)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def percent(self):
+        if self.bytes_total:
+            return min(100, int(100 * self.bytes_done / self.bytes_total))
+        if self.files_total:
+            return min(100, int(100 * self.files_done / self.files_total))
+        return 100 if self.finished else 0
+
+    @property
+    def overall(self):
+        """percentage of the whole pack, see PROGRESS_WEIGHTS"""
+        _done = 0
+        for _stage, _weight in PROGRESS_WEIGHTS:
+            if _stage == self.stage:
+                return min(100, int(_done + _weight * self.percent / 100))
+            _done += _weight
+        return self.percent
+
+    @property
+    def throughput(self):
+        """bytes per second within the current stage"""
+        _elapsed = self.elapsed
+        return self.bytes_done / _elapsed if _elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """estimated seconds until the current stage is done, or None"""
+        _throughput = self.throughput
+        if not self.bytes_total or not _throughput:
+            return None
+        return max(0.0, (self.bytes_total - self.bytes_done) / _throughput)
+
+
+def formatBytes(nbytes):
+    for _unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(nbytes) < 1024 or _unit == "GiB":
+            break
+        nbytes /= 1024.0
+    return f"{nbytes:.1f} {_unit}" if _unit != "B" else f"{int(nbytes)} B"
+
+
+class ProgressBar(object):
+
+    """
+    progress callback drawing a single-line progress bar on a terminal
+    """
+
+    def __init__(self, stream=None, width=30):
+        self._stream = stream if stream is not None else sys.stderr
+        self._width = width
+
+    def __call__(self, progress):
+        _filled = int(self._width * progress.percent / 100)
+        _line = f"\r{progress.stage:<8} [{'#' * _filled}{'.' * (self._width - _filled)}] {progress.percent:3d}%"
+        if progress.files_total:
+            _line += f"  {progress.files_done}/{progress.files_total} files"
+        if progress.bytes_total:
+            _line += f"  {formatBytes(progress.bytes_done)}/{formatBytes(progress.bytes_total)}"
+            _line += f"  {formatBytes(progress.throughput)}/s"
+            if progress.eta is not None and not progress.finished:
+                _line += f"  ETA {progress.eta:.0f}s"
+        self._stream.write(_line + ("\n" if progress.finished else ""))
+        self._stream.flush()
+
+
+class ProgressLines(object):
+
+    """
+    progress callback printing one line per update
+
+    the lines start with "progress: <percent>%" giving the progress of the
+    whole pack, so that they can be matched by the progress regex of the Gooey
+    GUI. the progress of the current stage follows in brackets.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream if stream is not None else sys.stdout
+
+    def __call__(self, progress):
+        _line = f"progress: {progress.overall}% [ {progress.stage} {progress.percent}%"
+        if progress.files_total:
+            _line += f" {progress.files_done}/{progress.files_total} files"
+        if progress.bytes_total:
+            _line += f" {formatBytes(progress.bytes_done)}/{formatBytes(progress.bytes_total)}"
+            _line += f" {formatBytes(progress.throughput)}/s"
+        self._stream.write(_line + " ]\n")
+        self._stream.flush()
+
+
+def createProgress(mode="auto"):
+
+    """
+    create progress object for CLI mode "auto", "bar", "lines" or "none"
+    """
+
+    if mode == "auto":
+        mode = "bar" if sys.stderr.isatty() else "none"
+    if mode == "bar":
+        return Progress(ProgressBar())
+    if mode == "lines":
+        return Progress(ProgressLines())
+    return Progress()
+
+
+
+
+# per-file report
+class Report(object):
+
+    """
+    optional report file with one JSON record per processed file
+
+    if no path is given, all records are discarded without being formatted.
+    """
+
+    def __init__(self, path=""):
+        self._file = open(path, "w", encoding="utf-8") if path else None
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def write(self, **record):
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+
+
+# stage profiling
+class StageProfiler(object):
+
+    """
+    progress wrapper profiling each pipeline stage
+
+    between "start" and "finish" of a stage, the calling thread is profiled by
+    cProfile and, if memory is set, its allocations are traced by tracemalloc.
+    on finish, these files are written into folder:
+
+      <stage>.prof          profile data (e.g. for "python -m pstats")
+      <stage>.txt           functions sorted by cumulative time
+      <stage>.memory.txt    peak and remaining allocations of the stage
+      stages.txt            duration of each stage of the last pack
+
+    work done within other threads (e.g. parallel compression of solid
+    containers) is not part of the profiles. all other attributes are the ones
+    of the wrapped progress object.
+    """
+
+    def __init__(self, progress, folder, memory=False):
+        self._progress = progress
+        self._folder = folder
+        self._memory = memory
+        self._profile = None
+        self._stage = ""
+        self._started = 0.0
+        self._durations = {}
+
+    def __getattr__(self, name):
+        return getattr(self._progress, name)
+
+    def start(self, stage, files_total=0, bytes_total=0):
+        import cProfile
+
+        # a stage left by an exception is discarded
+        self.stop()
+        if stage == "parse":
+            self._durations = {}
+
+        self._progress.start(stage, files_total, bytes_total)
+        if self._memory:
+            import tracemalloc
+            tracemalloc.start()
+        self._stage = stage
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def finish(self):
+        if self._profile is not None:
+            self._profile.disable()
+            self._durations[self._stage] = time.perf_counter() - self._started
+            self._write()
+        self._progress.finish()
+
+    def stop(self):
+
+        # end profiling of an unfinished stage (e.g. when a stage failed)
+        # without writing its results
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile = None
+            if self._memory:
+                import tracemalloc
+                tracemalloc.stop()
+
+    def _write(self):
+        import pstats
+
+        os.makedirs(self._folder, exist_ok=True)
+        _base = os.path.join(self._folder, self._stage)
+
+
+
+
+        #
+        # write allocations
+        #
+
+        if self._memory:
+            import tracemalloc
+
+            _current, _peak = tracemalloc.get_traced_memory()
+            _snapshot = tracemalloc.take_snapshot().filter_traces(
+                    [tracemalloc.Filter(False, tracemalloc.__file__)])
+            tracemalloc.stop()
+            with open(_base + ".memory.txt", "w", encoding="utf-8") as _file:
+                _file.write(f"peak:      {formatBytes(_peak)}\nremaining: {formatBytes(_current)}\n\n")
+                for _statistic in _snapshot.statistics("lineno")[:PROFILE_LINES]:
+                    _file.write(f"{_statistic}\n")
+
+
+
+
+        #
+        # write profile
+        #
+
+        self._profile.dump_stats(_base + ".prof")
+        with open(_base + ".txt", "w", encoding="utf-8") as _file:
+            pstats.Stats(self._profile, stream=_file).sort_stats("cumulative").print_stats(PROFILE_LINES)
+        self._profile = None
+
+        with open(os.path.join(self._folder, "stages.txt"), "w", encoding="utf-8") as _file:
+            for _stage, _duration in self._durations.items():
+                _file.write(f"{_stage:<8} {_duration:>10.3f}s\n")
 
 
 
@@ -66,6 +433,16 @@ class Packer(object):
 
 
 
+        #
+        # initialize state of previous pack
+        #
+
+        # container member -> (source path, modification time, size)
+        self._sources = {}
+
+
+
+
         #
         # store main CLI argument
         #
@@ -101,7 +478,10 @@ class Packer(object):
 
             Possible commands are:
             pack    create Freeplane container file
-            unpack  [ not implemented, yet ]
+            watch   create container file and update it on changes
+            unpack  extract files from container file
+            verify  check integrity of container file
+            diff    compare two container files
             ''')
 
             # define command argument
@@ -126,7 +506,7 @@ class Packer(object):
             # check if command is provided in script
             if not hasattr(self, args.command):
 
-                logging.error('Unrecognized command. EXITING.')
+                logger.error('Unrecognized command. EXITING.')
                 parser.print_help()
                 sys.exit(1)
 
@@ -137,7 +517,15 @@ class Packer(object):
     def pack(self,
             mmpath="",
             mmxpath="",
-            log_level='info',
+            log_level=None,
+            progress=None,
+            report="",
+            container_format="zip",
+            search_roots=(),
+            search_hash=False,
+            search_cache="",
+            profile=False,
+            profile_memory=False,
             ):
 
 
@@ -158,7 +546,17 @@ class Packer(object):
             # write into object
             self._mmpath = args.mmpath
             self._mmxpath = args.mmxpath
-            self._log_level = args.log_level
+            self._format = args.format
+            self._configure(
+                    log_level=args.log_level,
+                    progress=createProgress(args.progress),
+                    report=args.report,
+                    search_roots=args.search_root,
+                    search_hash=args.search_hash,
+                    search_cache=args.search_cache,
+                    )
+            profile = args.profile or args.profile_memory
+            profile_memory = args.profile_memory
 
         # module was called from function
         else:
@@ -166,41 +564,15 @@ class Packer(object):
             # read from function arguments and write into object
             self._mmpath = mmpath
             self._mmxpath = mmxpath
-            self._log_level = log_level
-
-
-
-
-        #
-        # adjust logging level to user's wishes
-        #
-
-        if self._log_level.lower() == "debug":
-            logging.getLogger().setLevel(logging.DEBUG)
-        elif self._log_level.lower() == "info":
-            logging.getLogger().setLevel(logging.INFO)
-        elif self._log_level.lower() == "warning":
-            logging.getLogger().setLevel(logging.WARNING)
-        elif self._log_level.lower() == "error":
-            logging.getLogger().setLevel(logging.ERROR)
-        else:
-            logging.getLogger().setLevel(logging.WARNING)
-            logging.warning("log log level mismatch in user arguments. setting to WARNING.")
-
-
-
-
-        #
-        # connect to mindmap as information source
-        #
-
-        # here, the desired mindmap will be loaded for being parsed
-
-        # open mindmap
-        mindmap           = freeplane.Mindmap(self._mmpath)
-
-        # debug
-        logging.debug(f'mindmap "{self._mmpath}" will be exported into a container')
+            self._format = container_format
+            self._configure(
+                    log_level=log_level,
+                    progress=progress,
+                    report=report,
+                    search_roots=search_roots,
+                    search_hash=search_hash,
+                    search_cache=search_cache,
+                    )
 
 
 
@@ -220,265 +592,380 @@ class Packer(object):
             self._mmxpath = self._mmpath+"x"
 
 
+        # profile pipeline stages into a folder next to the container
+        if profile:
+            self._progress = StageProfiler(self._progress, self._mmxpath + ".profile", profile_memory)
 
 
-        #
-        # get list of linked file paths
-        #
-
-        # walk through entire mindmap and find links to files within the local
-        # file system. web links will be prevailed. it would be possible to
-        # convert web content e.g. to PDF and place it within the container.
 
-        lstFpnodes = mindmap.find_nodes()
-        dicHyperlinks = {}
 
-        # take each freeplane node within the mindmap
-        for fpnode in lstFpnodes:
+        #
+        # pack mindmap
+        #
 
+        try:
+            self._packFile()
+        finally:
 
+            # close report file and stop profiling, also if packing failed
+            self._report.close()
+            if profile:
+                self._progress.stop()
 
+        if profile:
+            logger.info('profile: stage profiles written into "%s"', self._mmxpath + ".profile")
 
-            #
-            # IF link is present in node
-            #
 
-            # get sanitized path string (no backslash)
-            _path = fpnode.hyperlink.replace("\\", "/")
-            if _path:
+    def watch(self,
+            mmpath="",
+            mmxpath="",
+            log_level=None,
+            progress=None,
+            report="",
+            container_format="zip",
+            search_roots=(),
+            search_hash=False,
+            search_cache="",
+            profile=False,
+            profile_memory=False,
+            interval=0.5,
+            debounce=0.2,
+            polling=False,
+            ):
 
+        """
+        pack mindmap and keep the container up to date until interrupted
 
+        the mindmap file and all linked files are watched for changes (using
+        inotify on Linux, otherwise by polling every interval seconds). when
+        no further change occured for debounce seconds, the container is
+        updated. members whose files did not change are copied from the
+        previous container without compressing them again.
+        """
 
 
-                #
-                # sanitize file link
-                #
 
-                # at this position, possible formats within the link attribute
-                # might be one of the following. when a mm file, there can also
-                # be appended a hash symbol followed by an NODE ID string
-                #
-                # - file:/C:/some-path/filename.ext (Windows)
-                # - file://some-absolute-path/filename.ext (Linux)
-                # - C:/some-absolute-path/filename.ext (Windows)
-                # - /some-absolute-path/filename.ext (Linux)
-                # - some-relative-path/filename.ext
-                # - filename.ext
 
-                # remove leading protocol token
-                _token = 'file:/'
-                if _path.lower().startswith(_token):
+        #
+        # create attributes from CLI or API arguments
+        #
 
-                    # remove file uri token
-                    _path = _path[len(_token):]
+        # module was started from command line?
+        if self._id == "cli":
 
+            # read from command line
+            parser = argparse.ArgumentParser(
+                    description='pack mindmap and update container on every change')
+            parseWatchArgs(parser)
+            args = parseOptArgs(parser)
 
+            # write into object
+            self._mmpath = args.mmpath
+            self._mmxpath = args.mmxpath
+            self._format = args.format
+            self._configure(
+                    log_level=args.log_level,
+                    progress=createProgress(args.progress),
+                    report=args.report,
+                    search_roots=args.search_root,
+                    search_hash=args.search_hash,
+                    search_cache=args.search_cache,
+                    )
+            profile = args.profile or args.profile_memory
+            profile_memory = args.profile_memory
+            interval = args.interval
+            debounce = args.debounce
+            polling = args.polling
 
+        # module was called from function
+        else:
 
-                #
-                # disregard all other link types
-                #
+            # read from function arguments and write into object
+            self._mmpath = mmpath
+            self._mmxpath = mmxpath
+            self._format = container_format
+            self._configure(
+                    log_level=log_level,
+                    progress=progress,
+                    report=report,
+                    search_roots=search_roots,
+                    search_hash=search_hash,
+                    search_cache=search_cache,
+                    )
 
-                #  - no other link types (http, ...)
-                #  - no local hyperlinks to other nodes
-                #  - no external hyperlinks to mindmap nodes -> just the mindmap files
+        if not self._mmxpath:
+            self._mmxpath = self._mmpath+"x"
+        if profile:
+            self._progress = StageProfiler(self._progress, self._mmxpath + ".profile", profile_memory)
 
-                # look for other protocol tokens (they start with at least 2
-                # characters and then a colon and a slash)
 
-                _match = re.search(r'^([A-z]{2,}:/)', _path)
-                if _match:
-                    logging.info(f'file "{_path}" uses a protocol token "{_match[1]}" which is not evaluated, here.')
-                    continue
 
-                if _path.startswith('#'):
-                    logging.debug(f'file "{_path}" uses a local node link. will be disregarded, here.')
-                    continue
 
+        #
+        # initial pack
+        #
 
+        try:
+            self._packFile()
+        except BaseException:
+            self._report.close()
+            if profile:
+                self._progress.stop()
+            raise
+        if profile:
+            logger.info('profile: stage profiles of each update written into "%s"', self._mmxpath + ".profile")
+        watcher = createWatcher(self._watchedPaths(), interval, polling)
+        logger.info('watch: watching %d files (press CTRL+C to stop)', len(watcher.paths))
 
 
-                #
-                # remove possible appended freeplane specifics
-                #
 
-                # remove hyperlink to node in external mindmap
-                _pos = _path.rfind('#')
-                if _pos > -1:
-                    _path = _path[:_pos]
 
+        #
+        # update container on changes
+        #
 
+        try:
+            while True:
+
+                # wait for first change, then until changes settle down
+                setChanged = watcher.wait()
+                while True:
+                    setMore = watcher.wait(debounce)
+                    if not setMore:
+                        break
+                    setChanged |= setMore
+
+                logger.info('watch: %d file(s) changed, updating container', len(setChanged))
+                _start = time.monotonic()
+                try:
+                    self._packFile()
+                except Exception:
+                    # e.g. mindmap just being written by Freeplane. the next
+                    # change will trigger another update.
+                    logger.exception('watch: update of container failed')
+                    if profile:
+                        self._progress.stop()
+                    continue
+                logger.info('watch: container updated in %.2fs', time.monotonic() - _start)
 
+                # linked files might have been added or removed
+                setPaths = self._watchedPaths()
+                if setPaths != watcher.paths:
+                    watcher.close()
+                    watcher = createWatcher(setPaths, interval, polling)
 
-                #
-                # initialize details list if not already done
-                #
+        except KeyboardInterrupt:
+            logger.info('watch: stopped')
 
-                if _path not in dicHyperlinks.keys():
-                    dicHyperlinks[_path] = []
+        finally:
+            watcher.close()
+            self._report.close()
+            if profile:
+                self._progress.stop()
 
 
+    def _watchedPaths(self):
 
+        # mindmap and all files added to the container
+        setPaths = set(_source for _source, _mtime, _size in self._sources.values())
+        setPaths.add(os.path.abspath(self._mmpath))
+        return setPaths
 
-                #
-                # create new dictionary entry
-                #
 
-                dicHyperlinks[_path].append(
-                        {
-                        'nodeid': fpnode.id,
-                        'type': "file",
-                        }
-                        )
+    def _packFile(self):
 
 
 
 
         #
-        # get list of in-line image paths
+        # import modules needed for packing
         #
 
-        # walk through entire mindmap and find paths to images within the local
-        # file system. web links will be prevailed.
-
-        # take each freeplane node within the mindmap
-        for fpnode in lstFpnodes:
+        import zipfile
 
 
 
 
-            #
-            # IF in-line image is present in node
-            #
+        #
+        # connect to mindmap as information source
+        #
 
-            _imagepath = fpnode.imagepath
-            if _imagepath:
+        # here, the desired mindmap will be loaded for being parsed
 
+        # open mindmap
+        self._progress.start("parse")
+        _root, _version   = parseMindmap(self._mmpath)
+        self._progress.finish()
 
+        # debug
+        logger.debug('mindmap "%s" will be exported into a container', self._mmpath)
 
 
-                #
-                # initialize details list if not already done
-                #
 
-                if _imagepath not in dicHyperlinks.keys():
-                    dicHyperlinks[_imagepath] = []
 
+        #
+        # open previous container
+        #
 
+        # if this object already packed the mindmap into the same container,
+        # members of unchanged files are copied from there without being
+        # compressed again. this is supported for ZIP containers only.
 
+        _previous = None
+        if self._sources and self._format == "zip" and os.path.isfile(self._mmxpath) \
+                and containerFormat(self._mmxpath) == "zip":
+            _previous = zipfile.ZipFile(self._mmxpath)
 
-                #
-                # get image size
-                #
 
-                _imagesize = fpnode.imagesize
 
 
+        #
+        # build container
+        #
 
+        # the container is written next to its final location and moved there
+        # when complete. so, an existing container is only replaced by a
+        # complete one. linked files are resolved relative to the mindmap's
+        # folder.
 
-                #
-                # store image details
-                #
+        _tmppath = self._mmxpath + ".tmp"
+        try:
+            with openContainer(_tmppath, self._format) as _container:
 
-                # create new dictionary entry
-                dicHyperlinks[_imagepath].append(
-                        {
-                        'nodeid': fpnode.id,
-                        'type': "image",
-                        'size': _imagesize,
-                        }
+                dicSources = self._packMembers(
+                        _root,
+                        fileResolver(os.path.dirname(os.path.abspath(self._mmpath))),
+                        _container,
+                        _previous,
                         )
 
 
 
 
-        #
-        # get list of html image sources
-        #
-
-        # walk through entire mindmap and find paths to images within the local
-        # file system. web links will be prevailed.
-
-        # take each freeplane node within the mindmap
-        for fpnode in lstFpnodes:
-
-
-
+                #
+                # save modified mindmap file into container
+                #
 
-            #
-            # collect all html image nodes present
-            #
+                self._progress.start("save")
+                _container.writestr(os.path.basename(self._mmpath), serializeMindmap(_root, _version))
+                self._progress.finish()
+
+                # central directory / index is written when closing the container
+                self._progress.start("archive")
+
+            # move container into place. only then, the state of the added
+            # files is taken for the next update, as a failed pack must not
+            # let unchanged members be copied from an outdated container.
+            os.replace(_tmppath, self._mmxpath)
+            self._sources = dicSources
+
+        except BaseException:
+
+            # no incomplete container is left behind, e.g. by failed updates
+            # of the watch command
+            if os.path.exists(_tmppath):
+                os.remove(_tmppath)
+            raise
+
+        finally:
+            if _previous is not None:
+                _previous.close()
+        self._progress.finish()
+        logger.info('archive: container "%s" created', self._mmxpath)
+
+
+    def pack_stream(self,
+            mindmap,
+            output,
+            resolver=None,
+            mmname="mindmap.mm",
+            log_level=None,
+            progress=None,
+            report="",
+            spool_threshold=SPOOL_THRESHOLD,
+            container_format="zip",
+            search_roots=(),
+            search_hash=False,
+            search_cache="",
+            ):
 
-            lstImageElements = []
+        """
+        pack mindmap from memory into a container written to a file object
 
-            # check for richcontent element
-            richnode = fpnode._node.find('richcontent')
-            if richnode is not None:
+        mindmap is the content of a ".mm" file as bytes or as readable binary
+        file object. linked files are requested from the resolver callback,
+        which is called once per referenced path (as written in the mindmap)
+        and returns the file's content as bytes, a readable binary file object
+        (closed by the packer), a local file path or None if the file is not
+        available. it is called right before the file is added, so only one
+        returned file is held at a time. without resolver, no files are added
+        to the container.
 
-                # check for html element
-                htmlnode = richnode.find('html')
-                if htmlnode is not None:
+        the container is written to output, which must be a writable binary
+        file object. if it is not seekable, a ZIP container is built in a
+        temporary file first, which is held in memory as long as it is
+        smaller than spool_threshold bytes. solid "tar.zst" containers are
+        always written sequentially.
 
-                    # check for html body element
-                    htmlbody = htmlnode.find('body')
-                    if htmlbody is not None:
+        files not returned by the resolver are looked up by name within
+        the folders search_roots (see "SearchIndex").
+        """
 
-                        # check for image elements directly below body tag
-                        lstImageElements = []
-                        lstImageElements.extend(htmlbody.findall('img'))
 
-                        # and now below paragraph elements
-                        for _element in htmlbody.findall('p'):
-                            lstImageElements.extend(_element.findall('img'))
 
 
+        #
+        # create attributes from API arguments
+        #
 
+        self._configure(
+                log_level=log_level,
+                progress=progress,
+                report=report,
+                search_roots=search_roots,
+                search_hash=search_hash,
+                search_cache=search_cache,
+                )
 
-            #
-            # insert paths into dictionary
-            #
 
-            for _element in lstImageElements:
 
-                _imagepath = _element.get("src")
 
+        #
+        # pack mindmap
+        #
 
+        try:
+            self._packStream(mindmap, output, resolver, mmname, spool_threshold, container_format)
+        finally:
 
+            # close report file, also if packing failed
+            self._report.close()
 
-                #
-                # skip http images
-                #
 
-                if _imagepath.startswith("http:/") \
-                        or _imagepath.startswith("https:/"):
-                    logging.debug(f'web-linked images like "{_imagepath}" will not be changed.')
-                    continue
+    def _packStream(self, mindmap, output, resolver, mmname, spool_threshold, container_format):
 
 
 
 
-                #
-                # initialize details list if not already done
-                #
+        #
+        # import modules needed for packing
+        #
 
-                if _imagepath not in dicHyperlinks.keys():
-                    dicHyperlinks[_imagepath] = []
+        import shutil
+        import tempfile
 
 
 
 
-                #
-                # store image details
-                #
+        #
+        # parse mindmap
+        #
 
-                # create new dictionary entry
-                dicHyperlinks[_imagepath].append(
-                        {
-                        'nodeid': fpnode.id,
-                        'type': "html_image",
-                        'element': _element,
-                        }
-                        )
+        self._progress.start("parse")
+        if not isinstance(mindmap, (bytes, bytearray, memoryview)):
+            mindmap = mindmap.read()
+        _root, _version = parseMindmap(mindmap)
+        self._progress.finish()
 
 
 
@@ -487,203 +974,2268 @@ class Packer(object):
         # build container
         #
 
-        # create container folder structure
-        _containerfolder = self._mmxpath + "_"
-        pathlib.Path(_containerfolder).mkdir(parents=True, exist_ok=True)
-        _filesfolder = os.path.join(_containerfolder, "files")
-        pathlib.Path(_filesfolder).mkdir(parents=True, exist_ok=True)
+        # zipfile is able to write into unseekable streams, but then has to
+        # append the sizes and checksums behind each member. to get a regular
+        # container, it is built in a temporary file instead, which spills to
+        # disk only if it gets larger than the threshold.
+
+        try:
+            _seekable = output.seekable() or container_format != "zip"
+        except AttributeError:
+            _seekable = False
+
+        _target = output if _seekable \
+                else tempfile.SpooledTemporaryFile(max_size=spool_threshold)
 
-        # set mindmap's path as current path
-        os.chdir(pathlib.Path(self._mmpath).parent)
+        with openContainer(_target, container_format) as _container:
 
-        lstAbsPaths = []
-        for _path, _infolist in dicHyperlinks.items():
+            self._packMembers(
+                    _root,
+                    resolver if resolver is not None else (lambda _path: None),
+                    _container,
+                    lazy=True,
+                    )
 
 
 
 
             #
-            # localize original file
+            # save modified mindmap into container
             #
 
-            # convert relative to absolute path. if the path starts with dots
-            # or if the path does not start with a drive letter or a slash.
+            self._progress.start("save")
+            _container.writestr(mmname, serializeMindmap(_root, _version))
+            self._progress.finish()
 
-            if re.search(r'^([A-z]{2,})', _path) is not None or _path.startswith('.'):
-                _path = os.path.abspath(_path)
+            # central directory / index is written when closing the container
+            self._progress.start("archive")
 
+        # copy temporary container into output stream
+        if not _seekable:
+            _target.seek(0)
+            shutil.copyfileobj(_target, output, COPY_BUFSIZE)
+            _target.close()
 
+        self._progress.finish()
+        logger.info('archive: container created')
 
 
-            #
-            # IF source file exists
-            #
+    def unpack(self,
+            mmxpath="",
+            folder="",
+            log_level=None,
+            ):
 
-            if not os.path.isfile(_path):
-                for _info in _infolist:
-                    logging.warning(f'file "{_path}" was NOT found as specified in node "{_info["nodeid"]}"')
-            else:
-                logging.info(f'file "{_path}" was found')
+        """
+        extract all files of a container into a folder
 
+        without folder, the files are extracted into a folder named like the
+        container without extension.
+        """
 
 
 
-                #
-                # IF file's basename was already seen
-                #
 
-                # in case, the current file has a name which does exist at
-                # another path location, the file name is to be modified within
-                # the container in order to keep both files. so, count how many
-                # times the "same" path name exists. as in windows os upper or
-                # lower case is not regarded, this might otherwise lead to
-                # overwrite of container files.
+        #
+        # create attributes from CLI or API arguments
+        #
 
-                _count = lstAbsPaths.count(_path.lower().replace("\\", "/"))
+        if self._id == "cli":
+            parser = argparse.ArgumentParser(
+                    description='extract files from container file')
+            parser.add_argument(
+                    '--folder',
+                    default='',
+                    help='folder path. where to extract the files into.',
+                    )
+            args = parseContainerArgs(parser)
+            mmxpath = args.mmxpath
+            folder = args.folder
+            log_level = args.log_level
 
-                # same with the basenames
-                lstBasenames = [os.path.basename(_path) for _path in lstAbsPaths]
-                _count += lstBasenames.count(os.path.basename(_path).lower())
+        self._configure(log_level=log_level)
+        if not folder:
+            folder = os.path.splitext(mmxpath)[0]
 
 
 
 
-                #
-                # paste file into container folder
-                #
+        #
+        # extract files
+        #
 
-                # already existing files within the container will be replaced
-                # by the fresh ones
+        if containerFormat(mmxpath) == "zip":
+            import zipfile
+            with zipfile.ZipFile(mmxpath) as _zipfile:
+                _zipfile.extractall(folder)
+                _count = len(_zipfile.infolist())
 
-                _basename = os.path.basename(_path)
+        else:
+            import tarfile
 
-                # adjust name if already multiple identical basenames transferred
-                if _count:
-                    _basename = os.path.splitext(_basename)[0] \
-                            + '__' \
-                            + str(_count) \
-                            + os.path.splitext(_basename)[1]
+            # only extract regular files into the folder
+            dicFilter = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
 
-                # paste file
-                shutil.copyfile(
-                    _path,
-                    os.path.join(
-                        _filesfolder,
-                        _basename,
-                        )
-                    )
+            _count = 0
+            with SolidReader(mmxpath) as _reader, _reader.stream() as _tar:
+                for _member in _tar:
+                    if _member.name != SOLID_INDEX:
+                        _tar.extract(_member, folder, **dicFilter)
+                        _count += 1
 
-                # remember the file path as being pasted into folder
-                lstAbsPaths.append(_path.lower().replace("\\", "/"))
+        logger.info('unpack: %d files extracted into "%s"', _count, folder)
 
 
+    def verify(self,
+            mmxpath="",
+            log_level=None,
+            ):
 
+        """
+        check integrity of all members of a container, return True if valid
+        """
 
-                #
-                # walk through infolist
-                #
 
-                for _info in _infolist:
 
 
+        #
+        # create attributes from CLI or API arguments
+        #
 
+        if self._id == "cli":
+            parser = argparse.ArgumentParser(
+                    description='check integrity of container file')
+            args = parseContainerArgs(parser)
+            mmxpath = args.mmxpath
+            log_level = args.log_level
 
-                    #
-                    # evaluate link type
-                    #
+        self._configure(log_level=log_level)
 
-                    if _info['type'] == "image":
 
 
 
+        #
+        # check checksums of all members
+        #
 
-                        #
-                        # link node's image section with new file location
-                        #
+        lstErrors = []
+        if containerFormat(mmxpath) == "zip":
+            import zipfile
+            with zipfile.ZipFile(mmxpath) as _zipfile:
+                _bad = _zipfile.testzip()
+                if _bad is not None:
+                    lstErrors.append(f'member "{_bad}" is corrupt')
+                lstNames = _zipfile.namelist()
 
-                        # find mindmap node
-                        _node = mindmap.find_nodes(id=_info['nodeid'])[0]
+        else:
+            import zlib
 
-                        # replace image element in mindmap
-                        _node.set_image(
-                                link='./files/' + _basename,
-                                size=_imagesize,
-                                )
+            with SolidReader(mmxpath) as _reader:
+                dicIndex = {_entry["name"]: _entry for _entry in _reader.index()}
+                lstNames = []
+                with _reader.stream() as _tar:
+                    for _member in _tar:
+                        if _member.name == SOLID_INDEX:
+                            continue
+                        lstNames.append(_member.name)
 
+                        # compute CRC32 of member data
+                        _crc = 0
+                        _file = _tar.extractfile(_member)
+                        for _chunk in iter(lambda: _file.read(COPY_BUFSIZE), b""):
+                            _crc = zlib.crc32(_chunk, _crc)
 
+                        _entry = dicIndex.pop(_member.name, None)
+                        if _entry is None:
+                            lstErrors.append(f'member "{_member.name}" is missing in index')
+                        elif _entry["size"] != _member.size or _entry["crc32"] != _crc:
+                            lstErrors.append(f'member "{_member.name}" is corrupt')
 
+                for _name in dicIndex:
+                    lstErrors.append(f'member "{_name}" is missing')
 
-                    elif _info['type'] == "html_image":
+        # a container holds a mindmap at its top level
+        if not any(_name.endswith(".mm") and "/" not in _name for _name in lstNames):
+            lstErrors.append('container holds no mindmap')
 
 
 
 
-                        #
-                        # link node's html image with new file location
-                        #
+        #
+        # report result
+        #
 
-                        # pick specific image node
-                        _img = _info['element']
+        for _error in lstErrors:
+            logger.error('verify: %s', _error)
+        if lstErrors:
+            logger.error('verify: container "%s" is NOT valid', mmxpath)
+        else:
+            logger.info('verify: container "%s" with %d members is valid', mmxpath, len(lstNames))
 
-                        # replace image path in node
-                        _img.set(
-                                "src",
-                                './files/' + _basename,
-                                )
+        if self._id == "cli" and lstErrors:
+            sys.exit(1)
 
+        return not lstErrors
 
 
+    def diff(self,
+            mmxpath="",
+            newmmxpath="",
+            log_level=None,
+            ):
 
-                    else:
+        """
+        compare two containers and return their differences
 
+        the members are compared by size and CRC32 as stored in the ZIP
+        central directories or solid indexes, without decompressing them. only
+        if the mindmaps differ, they are extracted and their links are
+        compared node by node. the result is returned as a dict with the keys
+        "added", "removed", "modified", "renamed" (list of old and new name)
+        and "links" ({node id: {"added": [...], "removed": [...]}}, each link
+        as (type, link)). on the command line, it is printed as well.
+        """
 
 
 
-                        #
-                        # link node to new file location
-                        #
 
-                        # find mindmap node
-                        _node = mindmap.find_nodes(id=_info['nodeid'])[0]
+        #
+        # create attributes from CLI or API arguments
+        #
 
-                        # replace hyperlink path in mindmap
-                        _node.hyperlink = 'files/' + _basename
+        if self._id == "cli":
+            parser = argparse.ArgumentParser(
+                    description='compare two container files')
+            args = parseDiffArgs(parser)
+            mmxpath = args.mmxpath
+            newmmxpath = args.newmmxpath
+            log_level = args.log_level
+
+        self._configure(log_level=log_level)
+
+
+
+
+        #
+        # compare members
+        #
+
+        dicOld = containerIndex(mmxpath)
+        dicNew = containerIndex(newmmxpath)
+        dicOld.pop(SOLID_INDEX, None)
+        dicNew.pop(SOLID_INDEX, None)
+
+        lstAdded = sorted(set(dicNew) - set(dicOld))
+        lstRemoved = sorted(set(dicOld) - set(dicNew))
+        lstModified = sorted(_name for _name in set(dicOld) & set(dicNew) if dicOld[_name] != dicNew[_name])
+
+        # files which only got another name have the same size and CRC32
+        dicRemoved = {}
+        for _name in lstRemoved:
+            dicRemoved.setdefault(dicOld[_name], []).append(_name)
+        lstRenamed = []
+        for _name in list(lstAdded):
+            _candidates = dicRemoved.get(dicNew[_name])
+            if _candidates:
+                _oldname = _candidates.pop(0)
+                lstRenamed.append((_oldname, _name))
+                lstAdded.remove(_name)
+                lstRemoved.remove(_oldname)
+
+
+
+
+        #
+        # compare links of mindmaps
+        #
+
+        # the top level ".mm" member of each container is the mindmap. it is
+        # only decompressed if it differs.
+
+        def mindmapName(dicMembers):
+            return next((_name for _name in sorted(dicMembers) if _name.endswith(".mm") and "/" not in _name), None)
+
+        _oldmap = mindmapName(dicOld)
+        _newmap = mindmapName(dicNew)
+        dicLinks = {}
+        if _oldmap is None or _newmap is None:
+            logger.warning('diff: at least one container holds no mindmap, links are not compared')
+        elif dicOld[_oldmap] != dicNew[_newmap]:
+            dicOldLinks = mindmapLinks(containerMember(mmxpath, _oldmap))
+            dicNewLinks = mindmapLinks(containerMember(newmmxpath, _newmap))
+            for _nodeid in sorted(set(dicOldLinks) | set(dicNewLinks), key=str):
+                setOld = dicOldLinks.get(_nodeid, set())
+                setNew = dicNewLinks.get(_nodeid, set())
+                if setOld != setNew:
+                    dicLinks[_nodeid] = {
+                            "added": sorted(setNew - setOld),
+                            "removed": sorted(setOld - setNew),
+                            }
+
+
+
+
+        #
+        # print differences
+        #
+
+        # on the command line only, API callers get the result returned
+        if self._id == "cli":
+            for _name in lstAdded:
+                print(f'A  {_name}')
+            for _name in lstRemoved:
+                print(f'D  {_name}')
+            for _name in lstModified:
+                print(f'M  {_name}')
+            for _oldname, _name in lstRenamed:
+                print(f'R  {_oldname} -> {_name}')
+            for _nodeid, dicChanges in dicLinks.items():
+                print(f'@  node "{_nodeid}"')
+                for _type, _link in dicChanges["removed"]:
+                    print(f'   - {_type:<10} {_link}')
+                for _type, _link in dicChanges["added"]:
+                    print(f'   + {_type:<10} {_link}')
+
+        logger.info(
+                'diff: %d added, %d removed, %d modified, %d renamed members, links of %d nodes changed',
+                len(lstAdded),
+                len(lstRemoved),
+                len(lstModified),
+                len(lstRenamed),
+                len(dicLinks),
+                )
+
+        dicDiff = {
+                "added": lstAdded,
+                "removed": lstRemoved,
+                "modified": lstModified,
+                "renamed": lstRenamed,
+                "links": dicLinks,
+                }
+
+        # exit status as known from diff: 1 if the containers differ
+        if self._id == "cli" and any(dicDiff.values()):
+            sys.exit(1)
+
+        return dicDiff
+
+
+    def pack_bytes(self, mindmap, resolver=None, **fkwargs):
+
+        """
+        pack mindmap from memory and return the container as bytes
+
+        see "pack_stream" for the arguments.
+        """
+
+        import io
+
+        _output = io.BytesIO()
+        self.pack_stream(mindmap, _output, resolver, **fkwargs)
+        return _output.getvalue()
+
+
+    def _configure(self, log_level=None, progress=None, report="", search_roots=(), search_hash=False,
+            search_cache=""):
+
+
+
+
+        #
+        # adjust logging level to user's wishes
+        #
+
+        # without explicit level, the level of the "packer" logger is left as
+        # configured by the application using the packer as a library
+
+        if log_level is None:
+            pass
+        elif log_level.lower() == "debug":
+            logger.setLevel(logging.DEBUG)
+        elif log_level.lower() == "info":
+            logger.setLevel(logging.INFO)
+        elif log_level.lower() == "warning":
+            logger.setLevel(logging.WARNING)
+        elif log_level.lower() == "error":
+            logger.setLevel(logging.ERROR)
+        else:
+            logger.setLevel(logging.WARNING)
+            logger.warning("log log level mismatch in user arguments. setting to WARNING.")
+
+        self._log_level = log_level
+
+
+
+
+        #
+        # set progress reporting
+        #
+
+        self._progress = progress if progress is not None else Progress()
+
+
+
+
+        #
+        # open report file
+        #
+
+        # per-file details are only written if the user asked for a report
+        # file. otherwise, only stage summaries are logged.
+
+        self._report = Report(report)
+
+
+
+
+        #
+        # set search roots for missing files
+        #
+
+        # the index is built when the first file is missing. it is kept by
+        # this object and only updated by further packs, e.g. by the updates
+        # of the watch command.
+
+        self._search = SearchIndex(search_roots, search_hash, search_cache) if search_roots else None
+
+
+    def _packMembers(self, root, resolver, container, previous=None, lazy=False):
+
+        """
+        collect, resolve and add all linked files below root element
+
+        the links within the mindmap are changed to point to the files within
+        the container. unchanged files already contained in the previous
+        container (a readable ZipFile) are copied from there. the state of the
+        added local files is returned as {member name: (path, mtime, size)}.
+
+        if lazy is set, the resolver is called by the copy stage, one file at
+        a time, instead of resolving all files in advance. so, files returned
+        as bytes or file objects are not held all at once. the sizes of these
+        files are not known in advance.
+        """
+
+        references = self._collect(root)
+        if lazy:
+
+            # missing files are only known while copying. so, the index of
+            # the search roots is loaded in advance.
+            if self._search is not None:
+                self._search.load(self._progress)
+            lstFound = [(_number, None, 0) for _number in range(len(references))]
+
+        else:
+            lstFound = self._resolve(references, resolver)
+
+        return self._copy(root, references, lstFound, container, previous, resolver)
+
+
+    def _collect(self, root):
+
+
+
+
+        #
+        # get list of referenced file paths
+        #
+
+        # find links to files within the local file system in the entire
+        # mindmap: node links, in-line images and images and links within the
+        # html contents of nodes, notes and details. web links will be
+        # prevailed. it would be possible to convert web content e.g. to PDF
+        # and place it within the container.
+        #
+        # instead of walking through all nodes, a few precompiled XPath
+        # queries are evaluated on the whole element tree. each hit is mapped
+        # back to its owning node. only the paths and node ids are kept, see
+        # "References".
+
+        self._progress.start("collect")
+        references = References(nodes=self._report.enabled)
+        _skipped = 0
+
+        for _type, _query, _attribute in referenceQueries():
+            for _element in _query(root):
+
+                _link = _element.get(_attribute)
+                _nodeid = owningNode(_element).get('ID')
+
+
+
+
+                #
+                # sanitize reference
+                #
+
+                _path, _reason = localPath(_link, _type)
+                if _path is None:
+                    logger.debug('reference "%s" in node "%s" %s. will be disregarded, here.', _link, _nodeid, _reason)
+
+                    # links to other nodes of the same mindmap are no files
+                    if not _link.startswith('#'):
+                        self._report.write(stage="collect", status="skipped", path=_link, nodes=[_nodeid])
+                        _skipped += 1
+                    continue
+
+
+
+
+                #
+                # add reference
+                #
+
+                references.add(_path, _nodeid)
+
+        self._progress.finish()
+        logger.info(
+                'collect: %d references to %d local paths found, %d other references skipped',
+                sum(references.counts),
+                len(references),
+                _skipped,
+                )
+
+        return references
+
+
+    def _resolve(self, references, resolver):
+
+
+
+
+        #
+        # resolve linked files
+        #
+
+        # the resolver returns the file's location or contents, or None if the
+        # file is not available
+
+        self._progress.start("resolve", files_total=len(references))
+        lstFound = []
+        lstMissing = []
+        for _number, _path in enumerate(references.paths):
+
+            _source = resolver(_path)
+
+
+
+
+            #
+            # IF source file exists
+            #
+
+            if _source is None:
+                lstMissing.append(_number)
+            else:
+                logger.debug('file "%s" was found', _path)
+
+                # remember file together with its size for the copy stage
+                lstFound.append((_number, _source, sourceSize(_source)))
+
+            self._progress.advance()
+
+        self._progress.finish()
+        self._missing(references, lstMissing, lstFound, len(lstFound))
+
+        return lstFound
+
+
+    def _missing(self, references, lstMissing, lstFound, found):
+
+        """
+        search and report missing files
+
+        recovered files are appended to lstFound. found is the number of files
+        found by the resolver.
+        """
+
+
+
+
+        #
+        # search missing files within search roots
+        #
+
+        if lstMissing and self._search is not None:
+            _recovered = len(lstFound)
+            lstMissing = self._recover(references, lstMissing, lstFound)
+            found += len(lstFound) - _recovered
+
+
+
+
+        #
+        # report missing files
+        #
+
+        for _count, _number in enumerate(lstMissing):
+
+            # report only the first missing files one by one
+            logger.log(
+                    logging.WARNING if _count < MAX_MISSING_WARNINGS else logging.DEBUG,
+                    'file "%s" was NOT found as specified in %d node(s), e.g. "%s"',
+                    references.paths[_number],
+                    references.counts[_number],
+                    references.firsts[_number],
+                    )
+            self._report.write(
+                    stage="resolve",
+                    status="missing",
+                    path=references.paths[_number],
+                    nodes=references.nodeids(_number),
+                    )
+
+        logger.log(
+                logging.WARNING if lstMissing else logging.INFO,
+                'resolve: %d files found, %d files NOT found',
+                found,
+                len(lstMissing),
+                )
+
+
+    def _recover(self, references, lstMissing, lstFound):
+
+        """
+        look up missing files within the index of the search roots
+
+        recovered files are appended to lstFound. the list of files still
+        missing is returned.
+        """
+
+        self._search.load(self._progress)
+        lstRemaining = []
+        _ambiguous = 0
+        for _number in lstMissing:
+
+            _path = references.paths[_number]
+            _source, lstCandidates = self._search.find(_path)
+
+            if _source is not None:
+                # recovered files are counted by the summary below and
+                # listed within the report only
+                logger.debug('file "%s" was recovered from "%s"', _path, _source)
+                self._report.write(
+                        stage="resolve",
+                        status="recovered",
+                        path=_path,
+                        source=_source,
+                        nodes=references.nodeids(_number),
+                        )
+                lstFound.append((_number, _source, sourceSize(_source)))
+                continue
+
+            # several different files of this name are known. rather than
+            # guessing, the link is reported and left as it is.
+            if lstCandidates:
+                _ambiguous += 1
+                logger.log(
+                        logging.WARNING if _ambiguous <= MAX_MISSING_WARNINGS else logging.DEBUG,
+                        'file "%s" is ambiguous, %d candidates found, e.g. "%s"',
+                        _path,
+                        len(lstCandidates),
+                        lstCandidates[0],
+                        )
+                self._report.write(
+                        stage="resolve",
+                        status="ambiguous",
+                        path=_path,
+                        candidates=lstCandidates,
+                        nodes=references.nodeids(_number),
+                        )
+            lstRemaining.append(_number)
+
+        self._search.save()
+        logger.info(
+                'search: %d files recovered, %d ambiguous',
+                len(lstMissing) - len(lstRemaining),
+                _ambiguous,
+                )
+
+        return lstRemaining
+
+
+    def _copy(self, root, references, lstFound, container, previous=None, resolver=None):
+
+
+
+
+        #
+        # add files to container
+        #
+
+        # different links might point to the same file. each file is counted
+        # only once, as it is copied only once.
+        setKeys = set()
+        _files = _bytes = 0
+        for _number, _source, _size in lstFound:
+            _key = sourceKey(_source)
+            if _key is None or _key not in setKeys:
+                setKeys.add(_key)
+                _files += 1
+                _bytes += _size
+
+        self._progress.start("copy", files_total=_files, bytes_total=_bytes)
+        dicMembers = {}
+        dicBasenames = {}
+        dicSources = {}
+        dicTargets = {}
+
+        def add(number, source, size):
+
+            _path = references.paths[number]
+
+
+
+
+            #
+            # IF file was already added
+            #
+
+            # different links might point to the same file (e.g. relative
+            # and absolute ones), see "sourceKey".
+
+            _islocal = isinstance(source, (str, os.PathLike))
+            _key = sourceKey(source)
+            _basename = dicMembers.get(_key) if _key is not None else None
+            _added = _basename is None
+            if _added:
+
+
+
+
+                #
+                # IF file's basename was already seen
+                #
+
+                # in case, the current file has a name which does exist at
+                # another path location, the file name is to be modified within
+                # the container in order to keep both files. so, count how many
+                # times the "same" basename exists. this might otherwise lead
+                # to overwrite of container files.
+
+                _basename = os.path.basename(os.fspath(source) if _islocal else _path)
+                _count = dicBasenames.get(_basename.lower(), 0)
+                dicBasenames[_basename.lower()] = _count + 1
+
+                # adjust name if already multiple identical basenames transferred
+                if _count:
+                    _basename = os.path.splitext(_basename)[0] \
+                            + '__' \
+                            + str(_count) \
+                            + os.path.splitext(_basename)[1]
+
+
+
+
+                #
+                # paste file into container
+                #
+
+                _arcname = "files/" + _basename
+                if _islocal:
+
+                    # remember source file's state for later updates
+                    _stat = os.stat(source)
+                    dicSources[_arcname] = (os.path.abspath(source), _stat.st_mtime_ns, _stat.st_size)
+
+                if previous is not None \
+                        and self._sources.get(_arcname) == dicSources.get(_arcname, False) \
+                        and _arcname in previous.NameToInfo:
+
+                    # file did not change since last pack
+                    copyRawMember(previous, previous.getinfo(_arcname), container)
+                    self._progress.advance(files=0, nbytes=size)
+                else:
+
+                    # progress of large files is reported while they are
+                    # written
+                    writeMember(
+                            container,
+                            _arcname,
+                            source,
+                            lambda _count: self._progress.advance(files=0, nbytes=_count),
+                            )
+
+                if _key is not None:
+                    dicMembers[_key] = _basename
+
+            if _added:
+                self._progress.advance()
+            self._report.write(
+                    stage="copy",
+                    status="found",
+                    path=_path,
+                    member="files/" + _basename,
+                    size=size,
+                    nodes=references.nodeids(number),
+                    )
+            dicTargets[_path] = _basename
+
+        lstMissing = []
+        _found = 0
+        for _number, _source, _size in lstFound:
+
+            # files of a lazy resolver are requested one at a time, right
+            # before being added
+            if _source is None:
+                _source = resolver(references.paths[_number])
+                if _source is None:
+                    lstMissing.append(_number)
+                    self._progress.advance()
+                    continue
+                _size = sourceSize(_source)
+                _found += 1
+
+            add(_number, _source, _size)
+
+        # files the lazy resolver did not return are searched and reported
+        # once all others were added
+        if lstMissing:
+            lstRecovered = []
+            self._missing(references, lstMissing, lstRecovered, _found)
+            self._progress.files_total += len(lstRecovered)
+            for _entry in lstRecovered:
+                add(*_entry)
+
+
+
+
+        #
+        # link nodes with new file locations
+        #
+
+        # the reference queries are evaluated once more, as the elements were
+        # not kept by the collect stage
+
+        for _type, _query, _attribute in referenceQueries():
+            for _element in _query(root):
+
+                _path, _reason = localPath(_element.get(_attribute), _type)
+                _basename = dicTargets.get(_path)
+                if _basename is None:
+                    continue
+
+                if _type == "image" or _type == "html_image":
+
+                    # replace image path in node's image hook or html content
+                    _element.set(_attribute, './files/' + _basename)
+
+                else:
+
+                    # replace hyperlink path in mindmap or node's html content
+                    _element.set(_attribute, 'files/' + _basename)
+
+        self._progress.finish()
+        logger.info(
+                'copy: %d files (%s) copied into container',
+                len(set(dicTargets.values())),
+                formatBytes(self._progress.bytes_done),
+                )
+
+        return dicSources
+
+
+
+
+#
+# MINDMAP FILES
+#
+
+# mindmaps are parsed and written the way "freeplane.Mindmap" loads and saves
+# them, but from and into memory. so, mindmaps given as file and as bytes are
+# treated alike.
+
+def parseMindmap(source):
+
+    """
+    parse mindmap given as file path or bytes, return (map element, version)
+
+    the encoding is chosen by the Freeplane version of the mindmap, as files
+    written before v1.8 are not encoded in UTF-8. some Freeplane versions
+    write "&nbsp;" entities, which are no valid XML. these are replaced if the
+    mindmap cannot be parsed otherwise.
+    """
+
+    freeplane = importFreeplane()
+    from lxml import etree
+
+    _path = os.fspath(source) if isinstance(source, (str, os.PathLike)) else None
+    if _path is None:
+        source = bytes(source)
+
+    # detect version from '<map version="freeplane 1.3.0">'
+    if _path is not None:
+        with open(_path, "rb") as _file:
+            _firstline = _file.readline()
+    else:
+        _end = source.find(b"\n")
+        _firstline = source[:_end if _end >= 0 else None]
+    _match = re.search(rb'freeplane (\d+(?:\.\d+)+)', _firstline)
+    _version = _match.group(1).decode("ascii") if _match else ""
+    _parser = etree.XMLParser(encoding=mindmapEncoding(_version), huge_tree=True)
+
+    try:
+        if _path is not None:
+            return etree.parse(_path, _parser).getroot(), _version
+        return etree.fromstring(source, _parser), _version
+
+    except etree.XMLSyntaxError:
+        logger.warning('parse: mindmap is no valid XML, "&nbsp;" entities are replaced')
+        if _path is not None:
+            with open(_path, "rb") as _file:
+                source = _file.read()
+        return etree.fromstring(source.replace(b"&nbsp;", b"&#160;"), _parser), _version
+
+
+def serializeMindmap(root, version):
+
+    """
+    return mindmap (map element of given Freeplane version) as bytes
+
+    as with "freeplane.Mindmap.save", mindmaps of versions before v1.8 get
+    the character substitutions these Freeplane versions expect.
+    """
+
+    from lxml import etree
+
+    _encoding = mindmapEncoding(version) or "utf-8"
+    _text = etree.tostring(root, pretty_print=True, method="xml", encoding=_encoding).decode(_encoding)
+
+    if version and tuple(int(_part) for _part in version.split(".")[:2]) < (1, 8):
+
+        # #160 characters representing <SPACE> and german special characters
+        # fitting to the UTF-8 HTML encoding
+        _text = _text.replace(chr(160), " ")
+        for _char in "äöüÄÖÜß":
+            _text = _text.replace(_char, f"&#x{ord(_char):x};")
+
+    # Freeplane does not expect an XML declaration
+    if not _text.startswith("<map"):
+        _text = _text.split("\n", 1)[1]
+
+    return _text.encode(_encoding)
+
+
+def mindmapEncoding(version):
+
+    # file encoding of a Freeplane version, None if unknown
+    if not version:
+        return None
+    return importFreeplane().get_version_specific_file_encoding(version)
+
+
+
+
+#
+# REFERENCE EXTRACTION
+#
+
+# precompiled XPath queries finding all references to files, created on first
+# use as they need lxml. each query is given together with the reference type
+# and the attribute holding the reference.
+REFERENCE_QUERIES = []
+
+
+def referenceQueries():
+
+    if not REFERENCE_QUERIES:
+        from lxml import etree
+        REFERENCE_QUERIES.extend([
+
+            # node hyperlinks
+            ("file", etree.XPath("descendant-or-self::node[@LINK != '']"), "LINK"),
+
+            # in-line images
+            ("image", etree.XPath("descendant-or-self::node/hook[@NAME = 'ExternalObject'][@URI != '']"), "URI"),
+
+            # images and links at any depth of html contents (node text,
+            # notes and details). "node/richcontent//img" would be much
+            # slower on large mindmaps, as libxml2 merges the node sets found
+            # below each node.
+            ("html_image", etree.XPath("descendant-or-self::img[@src != ''][ancestor::richcontent]"), "src"),
+            ("html_link", etree.XPath("descendant-or-self::a[@href != ''][ancestor::richcontent]"), "href"),
+
+            ])
+
+    return REFERENCE_QUERIES
+
+
+def owningNode(element):
+
+    # nearest freeplane node element containing the given element
+    while element is not None and element.tag != 'node':
+        element = element.getparent()
+    return element
+
+
+class References(object):
+
+    """
+    compact table of the file references of a mindmap
+
+    the references are grouped by local path. each path is stored once, the
+    number of its references and the id of its first node are kept within
+    parallel lists. the ids of all nodes are kept only if nodes is set (e.g.
+    for the report). neither elements nor per-reference objects are kept, so
+    even very large mindmaps need little memory besides the element tree.
+    """
+
+    __slots__ = ("paths", "counts", "firsts", "_nodes", "_numbers")
+
+    def __init__(self, nodes=False):
+        import array
+        self.paths = []
+        self.counts = array.array("L")
+        self.firsts = []
+        self._nodes = [] if nodes else None
+        self._numbers = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add(self, path, nodeid):
+        _number = self._numbers.get(path)
+        if _number is None:
+            _number = self._numbers[path] = len(self.paths)
+            self.paths.append(path)
+            self.counts.append(0)
+            self.firsts.append(nodeid)
+            if self._nodes is not None:
+                self._nodes.append([])
+        self.counts[_number] += 1
+        if self._nodes is not None:
+            self._nodes[_number].append(nodeid)
+
+    def nodeids(self, number):
+        # ids of all nodes referencing the path (only the first one if not kept)
+        return self._nodes[number] if self._nodes is not None else [self.firsts[number]]
+
+
+def mindmapLinks(data):
+
+    # all references of a mindmap given as bytes as {node id: {(type, link)}}
+    from lxml import etree
+
+    _root = etree.fromstring(data, etree.XMLParser(huge_tree=True))
+    dicLinks = {}
+    for _type, _query, _attribute in referenceQueries():
+        for _element in _query(_root):
+            dicLinks.setdefault(owningNode(_element).get('ID'), set()).add((_type, _element.get(_attribute)))
+    return dicLinks
+
+
+def localPath(link, kind="file"):
+
+    """
+    return local file path of a reference together with an empty string, or
+    None together with the reason why the reference is disregarded
+    """
+
+    # get sanitized path string (no backslash)
+    _path = link.strip().replace("\\", "/")
+
+
+
+
+    #
+    # sanitize file link
+    #
+
+    # at this position, possible formats within the link attribute might be
+    # one of the following. when a mm file, there can also be appended a hash
+    # symbol followed by an NODE ID string
+    #
+    # - file:/C:/some-path/filename.ext (Windows)
+    # - file:///C:/some-path/filename.ext (Windows, in-line images)
+    # - file://some-absolute-path/filename.ext (Linux)
+    # - C:/some-absolute-path/filename.ext (Windows)
+    # - /some-absolute-path/filename.ext (Linux)
+    # - some-relative-path/filename.ext
+    # - filename.ext
+
+    # remove leading protocol token
+    if _path.lower().startswith('file:'):
+        _path = _path[len('file:'):]
+
+        # no leading slashes in front of windows drive letters
+        if re.search(r'^/+[A-z]:/', _path):
+            _path = _path.lstrip('/')
+
+        # single leading slash for absolute linux paths
+        elif _path.startswith('//'):
+            _path = '/' + _path.lstrip('/')
+
+
+
+
+    #
+    # disregard all other link types
+    #
+
+    #  - no other link types (http, mailto, data, ...)
+    #  - no local hyperlinks to other nodes
+    #  - no external hyperlinks to mindmap nodes -> just the mindmap files
+
+    # look for other protocol tokens (they start with at least 2 characters
+    # and then a colon)
+
+    _match = re.search(r'^([A-z]{2,}):', _path)
+    if _match:
+        return None, f'uses a protocol token "{_match[1]}" which is not evaluated'
+
+    if _path.startswith('#'):
+        return None, 'is a local node link'
+
+    # remove hyperlink to node in external mindmap
+    if kind in ("file", "html_link"):
+        _pos = _path.rfind('#')
+        if _pos > -1:
+            _path = _path[:_pos]
+
+    if not _path:
+        return None, 'is empty'
+
+    return _path, ''
+
+
+
+
+#
+# FILE ACCESS
+#
+
+def fileResolver(basedir):
+
+    """
+    create resolver for files within the local file system
+
+    relative paths are interpreted relative to basedir. the resolver returns
+    the absolute path of an existing file or None.
+    """
+
+    def resolve(path):
+
+        # convert relative to absolute path. if the path does not start with
+        # a drive letter or a slash.
+
+        if not os.path.isabs(path) and re.search(r'^[A-z]:', path) is None:
+            path = os.path.normpath(os.path.join(basedir, path))
+
+        return path if os.path.isfile(path) else None
+
+    return resolve
+
+
+def sourceSize(source):
+
+    # size of resolved file in bytes, 0 if unknown (e.g. unseekable streams)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    try:
+        return os.fstat(source.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def sourceKey(source):
+
+    # key identifying a local file, None for other sources. as in windows os
+    # upper or lower case is not regarded, the key is in lower case.
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.normcase(os.path.abspath(os.fspath(source))).lower()
+    return None
+
+
+def writeMember(container, arcname, source, progress=None):
+
+    # write file path, bytes or readable file object into container. already
+    # compressed file types are stored within ZIP containers without being
+    # compressed again. progress is called with the number of bytes of each
+    # chunk written.
+    import zipfile
+
+    _stored = isinstance(container, zipfile.ZipFile) \
+            and os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS
+
+    if isinstance(source, (str, os.PathLike)):
+        if _stored:
+            writeStoredMember(container, arcname, source, progress)
+        elif isinstance(container, zipfile.ZipFile):
+
+            # as "ZipFile.write", but reporting the progress
+            _zinfo = zipfile.ZipInfo.from_file(source, arcname)
+            _zinfo.compress_type = container.compression
+            with open(source, "rb") as _file, container.open(_zinfo, "w") as _member:
+                copyStream(_file, _member, progress)
+
+        else:
+            container.write(source, arcname, progress)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        if _stored:
+            container.writestr(arcname, bytes(source), compress_type=zipfile.ZIP_STORED)
+        else:
+            container.writestr(arcname, bytes(source))
+        if progress is not None:
+            progress(len(source))
+    else:
+        if _stored:
+            arcname = zipfile.ZipInfo(arcname, time.localtime()[:6])
+            arcname.compress_type = zipfile.ZIP_STORED
+        with source, container.open(arcname, "w", force_zip64=True) as _member:
+            copyStream(source, _member, progress)
+
+
+def copyStream(source, target, progress=None):
+
+    # copy readable into writable file object through a buffer. progress is
+    # called with the number of bytes of each chunk.
+    while True:
+        _chunk = source.read(COPY_BUFSIZE)
+        if not _chunk:
+            break
+        target.write(_chunk)
+        if progress is not None:
+            progress(len(_chunk))
+
+
+def writeStoredMember(container, arcname, path, progress=None):
+
+    """
+    store file uncompressed within a ZIP container
+
+    the file's data is neither read nor written by Python. its CRC is computed
+    on a memory mapping of the file and the data is copied by the kernel (see
+    "copyFileData"). if the container is no regular file, zipfile is used.
+
+    progress is called with numbers of bytes. as the file is passed twice (for
+    its CRC and by the copy), each pass reports half of the file's size.
+    """
+
+    import mmap
+    import zipfile
+    import zlib
+
+    if fileDescriptor(container.fp) is None or not container._seekable:
+        container.write(path, arcname, compress_type=zipfile.ZIP_STORED)
+        if progress is not None:
+            progress(os.path.getsize(path))
+        return
+
+    with open(path, "rb") as _source:
 
 
 
 
         #
-        # save modified mindmap file into container folder
+        # compute CRC
         #
 
-        mindmap.save(
-                os.path.join(
-                    _containerfolder,
-                    os.path.basename(self._mmpath),
-                    )
+        _zinfo = zipfile.ZipInfo.from_file(path, arcname)
+        _zinfo.compress_type = zipfile.ZIP_STORED
+        _zinfo.file_size = _zinfo.compress_size = os.fstat(_source.fileno()).st_size
+        _zinfo.CRC = 0
+        if _zinfo.file_size:
+            with mmap.mmap(_source.fileno(), 0, access=mmap.ACCESS_READ) as _map, memoryview(_map) as _view:
+                for _offset in range(0, _zinfo.file_size, KERNEL_CHUNK_SIZE):
+                    with _view[_offset:_offset + KERNEL_CHUNK_SIZE] as _chunk:
+                        _zinfo.CRC = zlib.crc32(_chunk, _zinfo.CRC)
+                        _length = len(_chunk)
+                    if progress is not None:
+                        progress(_length // 2)
+
+
+
+
+        #
+        # write header and data
+        #
+
+        _writeLocalHeader(container, _zinfo)
+        copyFileData(
+                _source,
+                0,
+                container.fp,
+                _zinfo.file_size,
+                None if progress is None else (lambda _count: progress(_count - _count // 2)),
+                )
+        _registerMember(container, _zinfo)
+
+
+def copyRawMember(source, zinfo, target):
+
+    """
+    copy member from one ZIP file into another without recompressing it
+
+    zipfile offers no public interface for this. so, the member's local header
+    is rebuilt from its central directory entry and the compressed data is
+    copied as it is.
+    """
+
+    import copy
+    import struct
+    import zipfile
+
+    # skip local header of source member
+    source.fp.seek(zinfo.header_offset)
+    _header = struct.unpack(zipfile.structFileHeader, source.fp.read(zipfile.sizeFileHeader))
+    _offset = zinfo.header_offset + zipfile.sizeFileHeader \
+            + _header[zipfile._FH_FILENAME_LENGTH] + _header[zipfile._FH_EXTRA_FIELD_LENGTH]
+
+    # write local header of target member. as sizes and CRC are known, no
+    # data descriptor is needed.
+    _zinfo = copy.copy(zinfo)
+    _zinfo.flag_bits &= ~0x08
+    _writeLocalHeader(target, _zinfo)
+
+    # copy compressed data
+    copyFileData(source.fp, _offset, target.fp, zinfo.compress_size)
+    _registerMember(target, _zinfo)
+
+
+def _writeLocalHeader(container, zinfo):
+
+    # write local header of a member with known sizes and CRC at the end of a
+    # ZIP container. a zip64 extra field is rebuilt if necessary.
+    import zipfile
+
+    zinfo.extra = zipfile._strip_extra(zinfo.extra, (1,))
+    container.fp.seek(container.start_dir)
+    zinfo.header_offset = container.fp.tell()
+    container._writecheck(zinfo)
+    container.fp.write(zinfo.FileHeader())
+
+
+def _registerMember(container, zinfo):
+
+    # register member within container's central directory
+    container.filelist.append(zinfo)
+    container.NameToInfo[zinfo.filename] = zinfo
+    container.start_dir = container.fp.tell()
+    container._didModify = True
+
+
+def copyFileData(source, offset, target, count, progress=None):
+
+    """
+    copy count bytes from offset of source to the current position of target
+
+    source and target are binary file objects. if both are regular files, the
+    data is copied by the kernel using "os.copy_file_range" or "os.sendfile"
+    (no copies into Python buffers, less page cache use). where these calls
+    are not available or fail (e.g. other platforms, file systems or file
+    objects), the data is copied through a buffer. progress is called with the
+    number of bytes of each chunk copied.
+    """
+
+    import errno
+
+    _position = target.tell()
+    _done = 0
+    _sourcefd = fileDescriptor(source)
+    _targetfd = fileDescriptor(target)
+
+
+
+
+    #
+    # copy within the kernel
+    #
+
+    if _sourcefd is not None and _targetfd is not None:
+        target.flush()
+        os.lseek(_targetfd, _position, os.SEEK_SET)
+        for _method in ("copy_file_range", "sendfile"):
+            if _done >= count or not hasattr(os, _method):
+                continue
+            try:
+                while _done < count:
+                    _length = min(count - _done, KERNEL_CHUNK_SIZE)
+                    if _method == "copy_file_range":
+                        _copied = os.copy_file_range(_sourcefd, _targetfd, _length, offset + _done)
+                    else:
+                        _copied = os.sendfile(_targetfd, _sourcefd, offset + _done, _length)
+                    if not _copied:
+
+                        # some file systems return 0 instead of failing if
+                        # the call is not supported. only after data was
+                        # copied, 0 means that the source is truncated.
+                        if not _done:
+                            break
+                        raise EOFError("source file is truncated")
+                    _done += _copied
+                    if progress is not None:
+                        progress(_copied)
+            except OSError as _error:
+                # try next method if the call is not supported for these files
+                if _error.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                        errno.ENOTSUP, errno.EBADF, errno.EPERM):
+                    raise
+        target.seek(_position + _done)
+
+
+
+
+    #
+    # copy through buffer
+    #
+
+    source.seek(offset + _done)
+    while _done < count:
+        _chunk = source.read(min(COPY_BUFSIZE, count - _done))
+        if not _chunk:
+            raise EOFError("source file is truncated")
+        target.write(_chunk)
+        _done += len(_chunk)
+        if progress is not None:
+            progress(len(_chunk))
+
+
+def fileDescriptor(fileobj):
+
+    # descriptor of a file object backed by a file of the operating system,
+    # otherwise None. "fileno" is not called on other objects, as e.g.
+    # spooled temporary files would be rolled over to disk.
+    import io
+
+    _raw = getattr(fileobj, "raw", fileobj)
+    if isinstance(_raw, io.FileIO) and not _raw.closed:
+        return _raw.fileno()
+    return None
+
+
+
+
+
+#
+# FILE SEARCH
+#
+
+# links of mindmaps moved between machines often point to folders which do not
+# exist anymore, while the files themselves were copied somewhere else. such
+# files are looked up by name within an index of search root folders, which is
+# built by walking the folders in parallel and kept up to date by the packer
+# object. the index can be cached within a JSON file between runs.
+
+SEARCH_CACHE_VERSION = 2
+
+
+class SearchIndex(object):
+
+    """
+    index of all files below search root folders by lower case file name
+
+    "find" returns the file matching a link. if several files of the same name
+    exist, the ones sharing most trailing folder names with the link are
+    preferred. if there is still more than one, the file is ambiguous, unless
+    hashes are enabled and all candidates have the same contents.
+
+    each "load" (once per pack) validates the index against the modification
+    times of all its folders, which change whenever files are added, removed
+    or renamed within them. only changed folders are scanned again. this also
+    applies to an index read from the cache file.
+    """
+
+    def __init__(self, roots, hashes=False, cache="", threads=0):
+        self.roots = sorted(set(os.path.abspath(_root) for _root in roots))
+        self._hashes = hashes
+        self._cache = cache
+        self._threads = threads or min(32, 4 * (os.cpu_count() or 1))
+        self._folders = {}
+        self._names = None
+        self._digests = {}
+        self._modified = False
+
+
+
+
+    #
+    # index creation
+    #
+
+    def load(self, progress=None):
+
+        # read index from cache file, if not done yet, and bring it up to date
+        if self._names is None and self._cache and os.path.isfile(self._cache):
+            try:
+                with open(self._cache, encoding="utf-8") as _file:
+                    dicCache = json.load(_file)
+                if dicCache.get("version") == SEARCH_CACHE_VERSION and dicCache.get("roots") == self.roots:
+                    self._folders = {_folder: tuple(_entry) for _folder, _entry in dicCache["folders"].items()}
+                    self._digests = {_path: tuple(_entry) for _path, _entry in dicCache["digests"].items()}
+                    logger.info('search: index of %d folders read from "%s"', len(self._folders), self._cache)
+            except (OSError, ValueError, KeyError, TypeError) as _error:
+                logger.warning('search: cache file "%s" is invalid (%s), index is rebuilt', self._cache, _error)
+                self._folders = {}
+                self._digests = {}
+        self.build(progress)
+
+    def build(self, progress=None):
+
+        """
+        walk all search roots in parallel and index their files
+
+        each folder is handled by a task of its own, which submits tasks for
+        its subfolders. folders known from the cache are only scanned again
+        if their modification time changed. symbolic links to folders are not
+        followed.
+        """
+
+        import concurrent.futures
+
+        if progress is None:
+            progress = Progress()
+        progress.start("index")
+        _start = time.monotonic()
+        dicFolders = {}
+        _scanned = 0
+
+        # roots below other roots are walked only once
+        lstRoots = [
+                _root for _root in self.roots
+                if os.path.isdir(_root) and not any(
+                    _root.startswith(os.path.join(_other, "")) for _other in self.roots)
+                ]
+        for _root in set(self.roots) - set(lstRoots):
+            if not os.path.isdir(_root):
+                logger.warning('search: root "%s" is no folder', _root)
+
+        with concurrent.futures.ThreadPoolExecutor(self._threads) as _executor:
+
+            def submit(folder):
+                return _executor.submit(scanFolder, folder, self._folders.get(folder))
+
+            dicPending = {submit(_root): _root for _root in lstRoots}
+            while dicPending:
+                setDone, _notdone = concurrent.futures.wait(
+                        dicPending,
+                        return_when=concurrent.futures.FIRST_COMPLETED,
+                        )
+                for _future in setDone:
+                    _folder = dicPending.pop(_future)
+                    _entry, _rescanned = _future.result()
+                    if _entry is None:
+                        continue
+                    dicFolders[_folder] = _entry
+                    _scanned += _rescanned
+                    for _name in _entry[2]:
+                        _subfolder = os.path.join(_folder, _name)
+                        dicPending[submit(_subfolder)] = _subfolder
+                    progress.advance()
+
+        # the index of file names is created from the folders
+        self._modified = self._modified or bool(_scanned) or set(dicFolders) != set(self._folders)
+        self._folders = dicFolders
+        self._names = {}
+        for _folder, (_mtime, lstFiles, lstSubfolders) in dicFolders.items():
+            for _name, _size, _filemtime in lstFiles:
+                self._names.setdefault(_name.lower(), []).append(
+                        (os.path.join(_folder, _name), _size, _filemtime))
+
+        progress.finish()
+        logger.info(
+                'search: %d files in %d folders indexed in %.2fs, %d folders scanned',
+                sum(len(_entry[1]) for _entry in dicFolders.values()),
+                len(dicFolders),
+                time.monotonic() - _start,
+                _scanned,
                 )
 
+    def save(self):
+
+        # write index into cache file, if anything changed
+        if not self._cache or not self._modified or self._names is None:
+            return
+        dicCache = {
+                "version": SEARCH_CACHE_VERSION,
+                "roots": self.roots,
+                "folders": {_folder: list(_entry) for _folder, _entry in self._folders.items()},
+                "digests": {_path: list(_entry) for _path, _entry in self._digests.items()},
+                }
+        _tmppath = self._cache + ".tmp"
+        with open(_tmppath, "w", encoding="utf-8") as _file:
+            json.dump(dicCache, _file, ensure_ascii=False)
+        os.replace(_tmppath, self._cache)
+        self._modified = False
+
+
+
+
+    #
+    # look up
+    #
+
+    def find(self, link):
+
+        """
+        return (path, []) of the file matching link or (None, candidates)
+        """
+
+        if self._names is None:
+            self.load()
+
+        # links may use windows separators, whatever the current platform is
+        lstParts = [_part.lower() for _part in re.split(r'[\\/]', link) if _part not in ("", ".", "..")]
+        if not lstParts:
+            return None, []
+
+        # files changed since they were indexed are taken as they are now
+        lstEntries = list(filter(None, map(currentFile, self._names.get(lstParts[-1], []))))
+        if not lstEntries:
+            return None, []
+
 
 
 
         #
-        # build ZIP container
+        # prefer files sharing most trailing folder names with the link
         #
 
-        # create container
-        shutil.make_archive(self._mmxpath, 'zip', _containerfolder)
+        def score(entry):
+            lstPath = [_part.lower() for _part in re.split(r'[\\/]', entry[0])]
+            _score = 0
+            for _linkpart, _pathpart in zip(reversed(lstParts), reversed(lstPath)):
+                if _linkpart != _pathpart:
+                    break
+                _score += 1
+            return _score
 
-        # rename container
-        shutil.move(self._mmxpath + ".zip", self._mmxpath)
+        _best = max(map(score, lstEntries))
+        lstEntries = [_entry for _entry in lstEntries if score(_entry) == _best]
 
 
 
 
         #
-        # remove container folder
+        # IF several candidates remain
         #
 
-        shutil.rmtree(_containerfolder)
+        if len(lstEntries) > 1 and self._hashes \
+                and len(set(_entry[1] for _entry in lstEntries)) == 1 \
+                and len(set(map(self._digest, lstEntries))) == 1:
+
+            # all candidates are copies of the same file
+            lstEntries = lstEntries[:1]
+
+        if len(lstEntries) == 1:
+            return lstEntries[0][0], []
+        return None, sorted(_entry[0] for _entry in lstEntries)
+
+    def _digest(self, entry):
+
+        # content hash of indexed file, kept as long as the file is unchanged
+        import hashlib
+
+        _path, _size, _mtime = entry
+        _cached = self._digests.get(_path)
+        if _cached is not None and tuple(_cached[:2]) == (_size, _mtime):
+            return _cached[2]
+
+        _hash = hashlib.sha256()
+        with open(_path, "rb") as _file:
+            for _chunk in iter(lambda: _file.read(COPY_BUFSIZE), b""):
+                _hash.update(_chunk)
+        self._digests[_path] = (_size, _mtime, _hash.hexdigest())
+        self._modified = True
+        return _hash.hexdigest()
+
+
+def scanFolder(folder, cached=None):
+
+    """
+    return ((modification time, files, subfolders), rescanned) of a folder
+
+    files are given as (name, size, modification time), subfolders by name.
+    if the folder's modification time equals the one of cached, cached is
+    returned without scanning the folder. (None, False) is returned if the
+    folder cannot be read.
+    """
+
+    try:
+        _mtime = os.stat(folder).st_mtime_ns
+    except OSError as _error:
+        logger.debug('search: folder "%s" skipped (%s)', folder, _error)
+        return None, False
+    if cached is not None and cached[0] == _mtime:
+        return cached, False
+
+    lstFiles = []
+    lstFolders = []
+    try:
+        with os.scandir(folder) as _entries:
+            for _entry in _entries:
+                try:
+                    if _entry.is_dir(follow_symlinks=False):
+                        lstFolders.append(_entry.name)
+                    elif _entry.is_file():
+                        _stat = _entry.stat()
+                        lstFiles.append((_entry.name, _stat.st_size, _stat.st_mtime_ns))
+                except OSError:
+                    continue
+    except OSError as _error:
+        logger.debug('search: folder "%s" skipped (%s)', folder, _error)
+        return None, False
+
+    return (_mtime, lstFiles, lstFolders), True
+
+
+def currentFile(entry):
+
+    # indexed file as (path, size, modification time) as it is now, None if it
+    # vanished
+    _path, _size, _mtime = entry
+    try:
+        _stat = os.stat(_path)
+    except OSError:
+        return None
+    return _path, _stat.st_size, _stat.st_mtime_ns
+
+
+
+
+#
+# CONTAINER FORMATS
+#
+
+# besides the ZIP format (compatible to Freeplane's ".mmx" handling), the
+# packer can write a solid container: one tar stream compressed by zstd in
+# independent frames of SOLID_FRAME_SIZE bytes, which are compressed in
+# parallel. similar files (screenshots, text files, mindmaps) within the same
+# frame compress much better than within separate ZIP members. the file ends
+# with a seek table in zstd's seekable format, see
+# https://github.com/facebook/zstd/blob/dev/contrib/seekable_format/zstd_seekable_compression_format.md
+#
+# the last tar member SOLID_INDEX starts its own frame and lists all members
+# with size, CRC32 and offset. so, it can be read without decompressing the
+# whole container.
+
+CONTAINER_FORMATS = ("zip", "tar.zst")
+
+SOLID_FRAME_SIZE = 8 * 1024 * 1024
+SOLID_LEVEL = 9
+SOLID_INDEX = ".mmx-index.json"
+
+ZIP_MAGICS = (b"PK\x03\x04", b"PK\x05\x06")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+SEEKABLE_SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+
+
+def importZstandard():
+
+    # import on first use. the command line interfaces report the error.
+    try:
+        import zstandard
+    except ImportError as _error:
+        raise ImportError('please install package "zstandard" to use the "tar.zst" container format') from _error
+
+    return zstandard
+
+
+def containerFormat(path):
+
+    # determine container format from the file's first bytes
+    with open(path, "rb") as _file:
+        _magic = _file.read(4)
+    if _magic in ZIP_MAGICS:
+        return "zip"
+    if _magic == ZSTD_MAGIC:
+        return "tar.zst"
+    raise ValueError(f'file "{path}" is no container')
+
+
+def openContainer(file, container_format="zip"):
+
+    # open container for writing, file is a path or a writable file object
+    if container_format == "zip":
+        import zipfile
+        return zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED)
+    if container_format == "tar.zst":
+        return SolidWriter(file)
+    raise ValueError(f'unknown container format "{container_format}"')
+
+
+def containerIndex(path):
+
+    # members of a container as {name: (size, CRC32)}, read from the ZIP
+    # central directory or the index of a solid container
+    if containerFormat(path) == "zip":
+        import zipfile
+        with zipfile.ZipFile(path) as _zipfile:
+            return {_info.filename: (_info.file_size, _info.CRC) for _info in _zipfile.infolist()
+                    if not _info.is_dir()}
+
+    with SolidReader(path) as _reader:
+        return {_entry["name"]: (_entry["size"], _entry["crc32"]) for _entry in _reader.index()}
+
+
+def containerMember(path, name):
+
+    # data of a single member of a container
+    if containerFormat(path) == "zip":
+        import zipfile
+        with zipfile.ZipFile(path) as _zipfile:
+            return _zipfile.read(name)
+
+    with SolidReader(path) as _reader:
+        for _entry in _reader.index():
+            if _entry["name"] == name:
+                return _reader.read(_entry)
+    raise KeyError(f'member "{name}" not found in container "{path}"')
+
+
+class SolidWriter(object):
+
+    """
+    write solid container
+
+    the interface corresponds to the one of zipfile.ZipFile in write mode, as
+    far as it is used by the packer ("write", "writestr" and "open").
+    """
+
+    def __init__(self, file, level=SOLID_LEVEL, threads=0, frame_size=SOLID_FRAME_SIZE):
+        import collections
+        import concurrent.futures
+        import tarfile
+        import threading
+
+        self._zstandard = importZstandard()
+        self._tarfile = tarfile
+        self._owner = isinstance(file, (str, os.PathLike))
+        self._file = open(file, "wb") if self._owner else file
+        self._level = level
+        self._threads = threads or os.cpu_count() or 1
+        self._frame_size = frame_size
+        self._local = threading.local()
+        self._executor = concurrent.futures.ThreadPoolExecutor(self._threads)
+        self._pending = collections.deque()
+        self._buffer = bytearray()
+        self._offset = 0
+        self.frames = []
+        self.index = []
+        self._tar = tarfile.open(fileobj=_SolidTarSink(self), mode="w", format=tarfile.PAX_FORMAT)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *fargs):
+        self.close()
+
+
+
+
+    #
+    # member interface
+    #
+
+    def write(self, filename, arcname=None, progress=None):
+        with open(filename, "rb") as _source:
+            _stat = os.fstat(_source.fileno())
+            self.addfile(arcname or os.path.basename(filename), _source, _stat.st_size, _stat.st_mtime, progress)
+
+    def writestr(self, arcname, data):
+        import io
+        self.addfile(arcname, io.BytesIO(data), len(data))
+
+    def open(self, arcname, mode="w", force_zip64=False):
+        return _SolidMember(self, arcname)
+
+    def addfile(self, arcname, fileobj, size, mtime=None, progress=None):
+        _info = self._tarfile.TarInfo(arcname)
+        _info.size = size
+        _info.mtime = time.time() if mtime is None else mtime
+        _info.mode = 0o644
+        _source = _CrcReader(fileobj, progress)
+        self._tar.addfile(_info, _source)
+
+        # data ends on the next 512 byte block border
+        self.index.append({
+            "name": arcname,
+            "size": size,
+            "crc32": _source.crc,
+            "offset": self._offset - -(-size // 512) * 512,
+            "mtime": int(_info.mtime),
+            })
+
+    def close(self):
+        import io
+
+        if self._tar is None:
+            return
+
+        # index member and end of the tar stream in one last frame of its own,
+        # whatever its size
+        self._flushFrame()
+        self._frame_size = sys.maxsize
+        _data = json.dumps({"members": self.index}, ensure_ascii=False).encode("utf-8")
+        _info = self._tarfile.TarInfo(SOLID_INDEX)
+        _info.size = len(_data)
+        _info.mtime = time.time()
+        self._tar.addfile(_info, io.BytesIO(_data))
+        self._tar.close()
+        self._tar = None
+        self._flushFrame()
+        while self._pending:
+            self._writeFrame()
+        self._executor.shutdown()
+
+        # seek table as skippable frame
+        import struct
+        _table = b"".join(struct.pack("<II", _csize, _dsize) for _csize, _dsize in self.frames)
+        _table += struct.pack("<IBI", len(self.frames), 0, SEEKABLE_MAGIC)
+        self._file.write(struct.pack("<II", SEEKABLE_SKIPPABLE_MAGIC, len(_table)) + _table)
+
+        if self._owner:
+            self._file.close()
+
+
+
+
+    #
+    # parallel frame compression
+    #
+
+    def _append(self, data):
+        self._buffer += data
+        self._offset += len(data)
+        while len(self._buffer) >= self._frame_size:
+            self._submit(bytes(self._buffer[:self._frame_size]))
+            del self._buffer[:self._frame_size]
+
+    def _flushFrame(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+
+    def _submit(self, chunk):
+        self._pending.append((self._executor.submit(self._compress, chunk), len(chunk)))
+        while len(self._pending) > 2 * self._threads:
+            self._writeFrame()
+
+    def _compress(self, chunk):
+        # compressor objects must not be used by several threads at once
+        _compressor = getattr(self._local, "compressor", None)
+        if _compressor is None:
+            _compressor = self._zstandard.ZstdCompressor(level=self._level, write_checksum=True)
+            self._local.compressor = _compressor
+        return _compressor.compress(chunk)
+
+    def _writeFrame(self):
+        _future, _size = self._pending.popleft()
+        _frame = _future.result()
+        self._file.write(_frame)
+        self.frames.append((len(_frame), _size))
+
+
+class _SolidTarSink(object):
+
+    # file object receiving the tar stream
+    def __init__(self, writer):
+        self._writer = writer
+
+    def write(self, data):
+        self._writer._append(data)
+        return len(data)
+
+    def tell(self):
+        return self._writer._offset
+
+
+class _SolidMember(object):
+
+    # writable member of unknown size, buffered until closed
+
+    def __init__(self, writer, arcname):
+        import tempfile
+        self._writer = writer
+        self._arcname = arcname
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD)
+
+    def write(self, data):
+        return self._buffer.write(data)
+
+    def close(self):
+        if self._buffer is not None:
+            _size = self._buffer.tell()
+            self._buffer.seek(0)
+            self._writer.addfile(self._arcname, self._buffer, _size)
+            self._buffer.close()
+            self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *fargs):
+        self.close()
+
+
+class _CrcReader(object):
+
+    # file object wrapper computing the CRC32 of the data read. progress is
+    # called with the number of bytes of each read.
+    def __init__(self, fileobj, progress=None):
+        import zlib
+        self._fileobj = fileobj
+        self._crc32 = zlib.crc32
+        self._progress = progress
+        self.crc = 0
+
+    def read(self, size=-1):
+        _data = self._fileobj.read(size)
+        self.crc = self._crc32(_data, self.crc)
+        if self._progress is not None:
+            self._progress(len(_data))
+        return _data
+
+
+class SolidReader(object):
+
+    """
+    read solid container
+    """
+
+    def __init__(self, file):
+        self._zstandard = importZstandard()
+        self._owner = isinstance(file, (str, os.PathLike))
+        self._file = open(file, "rb") if self._owner else file
+        self.frames = self._readSeekTable()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *fargs):
+        self.close()
+
+    def close(self):
+        if self._owner:
+            self._file.close()
+
+    def _readSeekTable(self):
+
+        # list of frames as (offset, compressed size, decompressed size)
+        import struct
+
+        self._file.seek(-9, os.SEEK_END)
+        _count, _descriptor, _magic = struct.unpack("<IBI", self._file.read(9))
+        if _magic != SEEKABLE_MAGIC:
+            raise ValueError("container has no seek table")
+        _entrysize = 12 if _descriptor & 0x80 else 8
+        _tablesize = _count * _entrysize + 9
+        _tablestart = self._file.seek(-(_tablesize + 8), os.SEEK_END)
+        _magic, _framesize = struct.unpack("<II", self._file.read(8))
+        if _magic != SEEKABLE_SKIPPABLE_MAGIC or _framesize != _tablesize:
+            raise ValueError("container has an invalid seek table")
+
+        lstFrames = []
+        _offset = 0
+        _table = self._file.read(_count * _entrysize)
+        for _position in range(0, len(_table), _entrysize):
+            _csize, _dsize = struct.unpack_from("<II", _table, _position)
+            lstFrames.append((_offset, _csize, _dsize))
+            _offset += _csize
+        if _offset != _tablestart:
+            raise ValueError("seek table does not match container size")
+
+        return lstFrames
+
+    def readFrame(self, number):
+        _offset, _csize, _dsize = self.frames[number]
+        self._file.seek(_offset)
+        return self._zstandard.ZstdDecompressor().decompress(
+                self._file.read(_csize),
+                max_output_size=_dsize,
+                )
+
+    def read(self, entry):
+
+        # data of the member given by its index entry. only the frames
+        # containing the data are decompressed.
+        _start = entry["offset"]
+        _end = _start + entry["size"]
+        lstChunks = []
+        _position = 0
+        for _number, (_offset, _csize, _dsize) in enumerate(self.frames):
+            if _position >= _end:
+                break
+            if _position + _dsize > _start:
+                _data = self.readFrame(_number)
+                lstChunks.append(_data[max(0, _start - _position):_end - _position])
+            _position += _dsize
+        return b"".join(lstChunks)
+
+    def index(self):
+
+        # list of members as stored in the index. the index starts a frame of
+        # its own and is written into the last frame. containers written by
+        # older versions might have split a large index into several frames,
+        # so preceding frames are added until the index is complete.
+        import io
+        import tarfile
+
+        _data = b""
+        for _number in range(len(self.frames) - 1, -1, -1):
+            _data = self.readFrame(_number) + _data
+            try:
+                with tarfile.open(fileobj=io.BytesIO(_data)) as _tar:
+                    _member = _tar.extractfile(SOLID_INDEX)
+                    if _member is not None:
+                        return json.loads(_member.read().decode("utf-8"))["members"]
+            except (tarfile.TarError, KeyError):
+                continue
+        raise ValueError("container has no index")
+
+    def stream(self):
+
+        # tar stream of the whole container. members must be read in order.
+        import tarfile
+
+        self._file.seek(0)
+        _reader = self._zstandard.ZstdDecompressor().stream_reader(
+                self._file,
+                read_across_frames=True,
+                )
+        return tarfile.open(fileobj=_reader, mode="r|")
+
+
+
+
+#
+# FILE WATCHING
+#
+
+class InotifyWatcher(object):
+
+    """
+    watch files for changes using Linux' inotify interface
+
+    the folders containing the files are watched, as editors often replace
+    files instead of writing into them.
+    """
+
+    # inotify event masks (see "man inotify")
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, paths):
+        import ctypes
+        import ctypes.util
+        import struct
+
+        self._struct = struct.Struct("iIII")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.paths = set(os.path.abspath(_path) for _path in paths)
+        self._folders = {}
+        for _folder in set(os.path.dirname(_path) for _path in self.paths):
+            _wd = self._libc.inotify_add_watch(self._fd, os.fsencode(_folder), self.MASK)
+            if _wd < 0:
+                _errno = ctypes.get_errno()
+                self.close()
+                raise OSError(_errno, f'folder "{_folder}" can not be watched')
+            self._folders[_wd] = _folder
+
+    def wait(self, timeout=None):
+
+        """
+        return set of changed paths, empty if nothing changed within timeout
+        """
+
+        import select
+
+        _deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            _remaining = None if _deadline is None else max(0.0, _deadline - time.monotonic())
+            if not select.select([self._fd], [], [], _remaining)[0]:
+                return set()
+            try:
+                _data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+
+            # evaluate events of watched files only
+            setChanged = set()
+            _offset = 0
+            while _offset < len(_data):
+                _wd, _mask, _cookie, _length = self._struct.unpack_from(_data, _offset)
+                _offset += self._struct.size
+                _name = _data[_offset:_offset + _length].rstrip(b"\0")
+                _offset += _length
+                if _wd in self._folders:
+                    _path = os.path.join(self._folders[_wd], os.fsdecode(_name))
+                    if _path in self.paths:
+                        setChanged.add(_path)
+            if setChanged:
+                return setChanged
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(object):
+
+    """
+    watch files for changes by comparing modification time and size
+    """
+
+    def __init__(self, paths, interval=0.5):
+        self.paths = set(os.path.abspath(_path) for _path in paths)
+        self._interval = interval
+        self._signatures = {_path: self._signature(_path) for _path in self.paths}
+
+    @staticmethod
+    def _signature(path):
+        try:
+            _stat = os.stat(path)
+        except OSError:
+            return None
+        return (_stat.st_mtime_ns, _stat.st_size)
+
+    def wait(self, timeout=None):
+
+        """
+        return set of changed paths, empty if nothing changed within timeout
+        """
+
+        _deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            setChanged = set()
+            for _path, _signature in self._signatures.items():
+                _current = self._signature(_path)
+                if _current != _signature:
+                    self._signatures[_path] = _current
+                    setChanged.add(_path)
+            if setChanged:
+                return setChanged
+            if _deadline is None:
+                time.sleep(self._interval)
+            elif time.monotonic() >= _deadline:
+                return set()
+            else:
+                time.sleep(min(self._interval, max(0.0, _deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+
+def createWatcher(paths, interval=0.5, polling=False):
+
+    # use inotify where available, otherwise poll the files
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError) as _error:
+            logger.info('watch: inotify not available (%s), polling files instead', _error)
+    return PollingWatcher(paths, interval)
 
 
 
@@ -717,6 +3269,56 @@ def parseOptArgs(parser):
             help=   'log messages will be displayed only if severity level is matching or above.' + \
                     ' options are "debug", "info", "warning" or "error"',
             )
+    parser.add_argument(
+            '--format',
+            default='zip',
+            choices=CONTAINER_FORMATS,
+            help=   'container format. "zip" can be opened by Freeplane, "tar.zst" is a solid format' + \
+                    ' compressing many similar files much better (needs package "zstandard").',
+            )
+    parser.add_argument(
+            '--report',
+            default='',
+            help=   'report file path. if given, details about each linked file are written into this' + \
+                    ' file (one JSON record per line).',
+            )
+    parser.add_argument(
+            '--progress',
+            default='auto',
+            choices=['auto', 'bar', 'lines', 'none'],
+            help=   'progress display. "bar" draws a progress bar, "lines" prints one line per update' + \
+                    ' and "auto" draws a bar only when running in a terminal.',
+            )
+    parser.add_argument(
+            '--search-root',
+            default=[],
+            action='append',
+            help=   'folder path. linked files which do not exist are looked up by name below this' + \
+                    ' folder. can be given several times.',
+            )
+    parser.add_argument(
+            '--search-hash',
+            action='store_true',
+            help=   'compare contents of files found several times below the search roots. identical' + \
+                    ' copies are not reported as ambiguous.',
+            )
+    parser.add_argument(
+            '--search-cache',
+            default='',
+            help=   'cache file path. the index of the search roots is stored in this file and reused' + \
+                    ' by later runs.',
+            )
+    parser.add_argument(
+            '--profile',
+            action='store_true',
+            help=   'profile each pipeline stage. the profiles are written into the folder' + \
+                    ' "<container>.profile".',
+            )
+    parser.add_argument(
+            '--profile-memory',
+            action='store_true',
+            help='profile also the memory allocations of each pipeline stage (slower).',
+            )
 
 
 
@@ -732,6 +3334,86 @@ def parseOptArgs(parser):
     return args
 
 
+def parseContainerArgs(parser):
+
+
+
+
+    #
+    # define arguments of commands working on existing containers
+    #
+
+    parser.add_argument(
+            'mmxpath',
+            help='container file path.',
+            )
+    parser.add_argument(
+            '--log-level',
+            default='info',
+            help=   'log messages will be displayed only if severity level is matching or above.' + \
+                    ' options are "debug", "info", "warning" or "error"',
+            )
+
+    # evaluate subcommand line arguments
+    return parser.parse_args(sys.argv[2:])
+
+
+def parseDiffArgs(parser):
+
+
+
+
+    #
+    # define arguments of diff command
+    #
+
+    parser.add_argument(
+            'mmxpath',
+            help='container file path of the old version.',
+            )
+    parser.add_argument(
+            'newmmxpath',
+            help='container file path of the new version.',
+            )
+    parser.add_argument(
+            '--log-level',
+            default='info',
+            help=   'log messages will be displayed only if severity level is matching or above.' + \
+                    ' options are "debug", "info", "warning" or "error"',
+            )
+
+    # evaluate subcommand line arguments
+    return parser.parse_args(sys.argv[2:])
+
+
+def parseWatchArgs(parser):
+
+
+
+
+    #
+    # define arguments of watch command
+    #
+
+    parser.add_argument(
+            '--interval',
+            default=0.5,
+            type=float,
+            help='seconds between checks for changes when files are polled.',
+            )
+    parser.add_argument(
+            '--debounce',
+            default=0.2,
+            type=float,
+            help='seconds without further changes before the container is updated.',
+            )
+    parser.add_argument(
+            '--polling',
+            action='store_true',
+            help='poll files for changes even if inotify is available.',
+            )
+
+
 
 
 #
@@ -747,4 +3429,9 @@ if __name__ == "__main__":
     # run the application
     #
 
-    app = Packer('cli')
+    configureLogging()
+    try:
+        app = Packer('cli')
+    except ImportError as _error:
+        print(f'[ ERROR  : {_error} ]')
+        sys.exit(1)